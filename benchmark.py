@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy
+from fastmcp import Client
+from fastmcp.client.client import CallToolResult
+
+from mcp_server import main as server
+from mcp_server.replay_controller import FrameReplayController
+
+resource_dir = Path(__file__).parent.resolve() / "assets" / "resource"
+ocr_model_dir = resource_dir / "model" / "ocr"
+
+# 依赖 OCR 模型的场景，模型缺失时识别结果为空，耗时没有参考意义
+OCR_SCENARIOS = {"ocr_cached", "ocr_after_click", "ocr_many", "ocr_concurrent_devices"}
+# 返回文字识别结果的工具
+OCR_TOOLS = {"ocr", "ocr_many"}
+# 按设备返回 {ID: {"result", "latency_ms", "error"}} 的多设备工具
+FAN_OUT_TOOLS = {"ocr_many", "screencap_many", "click_many"}
+
+
+def synthesize_frames(count: int = 4) -> list[numpy.ndarray]:
+    """生成带文字与色块的固定随机帧，在没有录制截图时使用"""
+    rng = numpy.random.default_rng(0)
+    frames = []
+    for index in range(count):
+        frame = numpy.full((720, 1280, 3), 32, dtype=numpy.uint8)
+        for row in range(8):
+            color = tuple(int(value) for value in rng.integers(64, 255, 3))
+            cv2.rectangle(frame, (40, 40 + row * 80), (600, 100 + row * 80), color, -1)
+            cv2.putText(
+                frame,
+                f"Item {index}-{row}",
+                (700, 80 + row * 80),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                1.2,
+                (255, 255, 255),
+                2,
+            )
+        frames.append(frame)
+    return frames
+
+
+def summarize(latencies: list[float], wall: float, failures: int = 0) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+    return {
+        "calls": len(ordered),
+        "failures": failures,
+        "throughput_per_s": round(len(ordered) / wall, 2) if wall > 0 else None,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def failed_value(name: str, value: Any, expect_text: bool) -> bool:
+    """
+    返回 None 或 False、返回 success 为 False 的结果时视为失败
+
+    expect_text 为 True 时画面中必然有文字，OCR 结果为空同样视为失败。
+    """
+    if value is None or value is False:
+        return True
+    if isinstance(value, dict) and value.get("success") is False:
+        return True
+    return expect_text and name in OCR_TOOLS and value == []
+
+
+def failed(name: str, result: CallToolResult, expect_text: bool) -> bool:
+    """工具报错或结果无效时视为调用失败，多设备工具中任一设备失败即视为失败"""
+    if result.is_error:
+        return True
+    if name not in FAN_OUT_TOOLS:
+        return failed_value(name, result.data, expect_text)
+    entries = result.data
+    if not isinstance(entries, dict) or not entries:
+        return True
+    return any(
+        entry.get("error") or failed_value(name, entry.get("result"), expect_text)
+        for entry in entries.values()
+    )
+
+
+async def measure(
+    client: Client,
+    calls: list[tuple[str, dict]],
+    concurrent: bool,
+    expect_text: bool,
+) -> dict:
+    latencies: list[float] = []
+    failures = 0
+
+    async def call(name: str, arguments: dict) -> None:
+        nonlocal failures
+        start = time.perf_counter()
+        result = await client.call_tool(name, arguments, raise_on_error=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        failures += failed(name, result, expect_text)
+
+    start = time.perf_counter()
+    if concurrent:
+        await asyncio.gather(*(call(name, arguments) for name, arguments in calls))
+    else:
+        for name, arguments in calls:
+            await call(name, arguments)
+    return summarize(latencies, time.perf_counter() - start, failures)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    if args.frames:
+        frames = FrameReplayController.from_directory(args.frames).frames
+    else:
+        frames = synthesize_frames()
+
+    controller_ids, tasker_ids = [], []
+    async with Client(server.mcp) as client:
+        resource_id = (
+            await client.call_tool(
+                "load_resource", {"resource_path": str(resource_dir)}
+            )
+        ).data
+        if resource_id is None:
+            print(f"资源加载失败：{resource_dir}", file=sys.stderr)
+            sys.exit(1)
+        for _ in range(args.devices):
+            controller = FrameReplayController(
+                frames,
+                screencap_latency=args.screencap_latency / 1000,
+                input_latency=args.input_latency / 1000,
+            )
+            controller.post_connection().wait()
+            controller_id = server.object_registry.register(controller, "controller")
+            tasker_id = (
+                await client.call_tool(
+                    "create_tasker",
+                    {"controller_id": controller_id, "resource_id": resource_id},
+                )
+            ).data
+            controller_ids.append(controller_id)
+            tasker_ids.append(tasker_id)
+
+        controller_id, tasker_id = controller_ids[0], tasker_ids[0]
+        n = args.iterations
+        # 点击会切换帧并使帧缓存失效，交替调用以测量未命中缓存时的开销
+        scenarios = {
+            "ocr_cached": [("ocr", {"tasker_id": tasker_id, "compact": True})] * n,
+            "ocr_after_click": [
+                call
+                for _ in range(n)
+                for call in (
+                    ("click", {"controller_id": controller_id, "x": 10, "y": 10}),
+                    ("ocr", {"tasker_id": tasker_id, "compact": True}),
+                )
+            ],
+            "screencap": [
+                ("screencap", {"controller_id": controller_id, "image_format": "jpg"})
+            ]
+            * n,
+            "click": [("click", {"controller_id": controller_id, "x": 10, "y": 10})] * n,
+            "run_actions_10": [
+                (
+                    "run_actions",
+                    {
+                        "controller_id": controller_id,
+                        "actions": [{"type": "click", "x": 10, "y": 10}] * 10,
+                    },
+                )
+            ]
+            * max(1, n // 10),
+            "ocr_many": [("ocr_many", {"tasker_ids": tasker_ids})] * max(1, n // 4),
+            "ocr_concurrent_devices": [
+                ("ocr", {"tasker_id": tasker, "compact": True}) for tasker in tasker_ids
+            ]
+            * max(1, n // len(tasker_ids)),
+        }
+
+        results = {}
+        for name, calls in scenarios.items():
+            if args.scenario and name not in args.scenario:
+                continue
+            concurrent = name == "ocr_concurrent_devices"
+            # 合成帧中绘制了文字，录制的截图不一定包含文字
+            expect_text = not args.frames
+            results[name] = await measure(client, calls, concurrent, expect_text)
+    return results
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float, min_delta_ms: float
+) -> bool:
+    """与基准结果比较 p50 耗时，比例与绝对值均超出容差时视为性能回退"""
+    ok = True
+    print(f"{'scenario':<24}{'baseline p50':>14}{'current p50':>14}{'delta':>10}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            print(f"{name:<24}{'-':>14}{current['p50_ms']:>14}{'new':>10}")
+            continue
+        delta_ms = current["p50_ms"] - previous["p50_ms"]
+        delta = delta_ms / max(previous["p50_ms"], 1e-6)
+        regressed = delta > tolerance and delta_ms > min_delta_ms
+        ok = ok and not regressed
+        mark = " !" if regressed else ""
+        print(
+            f"{name:<24}{previous['p50_ms']:>14}{current['p50_ms']:>14}"
+            f"{delta * 100:>9.1f}%{mark}"
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="使用离线回放控制器对 MCP 工具进行性能基准测试"
+    )
+    parser.add_argument("--frames", type=Path, help="录制截图目录，缺省时使用合成帧")
+    parser.add_argument("--devices", type=int, default=4, help="模拟设备数")
+    parser.add_argument("--iterations", type=int, default=40, help="每个场景的调用次数")
+    parser.add_argument(
+        "--screencap-latency", type=float, default=150, help="模拟截图耗时（毫秒）"
+    )
+    parser.add_argument(
+        "--input-latency", type=float, default=20, help="模拟输入耗时（毫秒）"
+    )
+    parser.add_argument("--scenario", action="append", help="仅运行指定场景，可重复")
+    parser.add_argument("--output", type=Path, help="将结果写入 JSON 文件")
+    parser.add_argument("--baseline", type=Path, help="与该 JSON 基准结果比较")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="允许的 p50 回退比例"
+    )
+    parser.add_argument(
+        "--min-delta-ms", type=float, default=2.0, help="忽略小于该值的 p50 变化（毫秒）"
+    )
+    args = parser.parse_args()
+
+    needs_ocr = not args.scenario or OCR_SCENARIOS & set(args.scenario)
+    if needs_ocr and not any(ocr_model_dir.glob("*.onnx")):
+        print(
+            f"未找到 OCR 模型（{ocr_model_dir}），OCR 场景只会测到空操作，"
+            "请先放入模型或使用 --scenario 仅运行截图与操作场景",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    # 存在失败调用时耗时不可信，不保存结果也不与基准比较
+    failures = {name: result["failures"] for name, result in results.items()}
+    if any(failures.values()):
+        for name, count in failures.items():
+            if count:
+                print(f"{name}: {count} 次调用失败", file=sys.stderr)
+        sys.exit(1)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        if not compare(results, baseline, args.tolerance, args.min_delta_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
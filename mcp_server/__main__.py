@@ -5,8 +5,37 @@ This file allows the MCP server to be run as a Python module:
     python -m mcp_server
 
 It imports and runs the main MCP server from main.py.
+
+Run with --startup-timing to print the import and warm-up timings to stderr
+and exit without serving.
+
+Run with --transport http to serve many clients from one long-lived process:
+    python -m mcp_server --transport http --host 127.0.0.1 --port 8000
 """
+import argparse
+import sys
+
+from .startup import warmup
 from .main import mcp
 
 if __name__ == "__main__":
-    mcp.run()
+    parser = argparse.ArgumentParser(prog="python -m mcp_server")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--startup-timing", action="store_true")
+    args = parser.parse_args()
+
+    if args.startup_timing:
+        warmup.verbose = True
+        warmup.mark("import")
+        warmup.start()
+        warmup.wait()
+        for name, error in warmup.errors.items():
+            print(f"[startup] {name} failed: {error}", file=sys.stderr)
+        sys.exit(1 if warmup.errors else 0)
+    warmup.mark("import")
+    if args.transport == "http":
+        mcp.run(transport="http", host=args.host, port=args.port)
+    else:
+        mcp.run()
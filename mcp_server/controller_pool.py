@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Optional
+
+from mcp_server.stats import stats
+
+if TYPE_CHECKING:
+    from maa.controller import Controller
+
+
+# 截图方式测速时每种方式的截图次数
+BENCHMARK_SAMPLES = 3
+# 健康探测使用的 shell 命令超时（毫秒）
+PROBE_TIMEOUT_MS = 3000
+
+
+@dataclass
+class PooledController:
+    key: str
+    name: str
+    kind: str
+    controller_id: str
+    controller: Controller
+    healthy: bool = True
+    failures: int = 0
+    # 重连失败后，在该时间点（time.monotonic）之前不再尝试
+    retry_after: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def screencap_method_bits(methods: int) -> list[int]:
+    """将截图方式位掩码拆分为单独的截图方式"""
+    return [1 << bit for bit in range(methods.bit_length()) if methods & (1 << bit)]
+
+
+def benchmark_screencap(
+    create: Callable[[int], Controller], methods: int
+) -> Optional[int]:
+    """
+    逐一测试位掩码中的截图方式，返回截图耗时中位数最小且可用的方式
+
+    create 根据单一截图方式创建控制器。所有方式均不可用时返回 None。
+    """
+    best, best_elapsed = None, float("inf")
+    for method in screencap_method_bits(methods):
+        controller = create(method)
+        if not controller.post_connection().wait().succeeded:
+            continue
+        samples = []
+        for _ in range(BENCHMARK_SAMPLES):
+            start = time.perf_counter()
+            image = controller.post_screencap().wait().get()
+            if image is None or image.size == 0:
+                break
+            samples.append(time.perf_counter() - start)
+        else:
+            elapsed = statistics.median(samples)
+            if elapsed < best_elapsed:
+                best, best_elapsed = method, elapsed
+    return best
+
+
+class ControllerPool:
+    def __init__(
+        self,
+        probe_interval: float = 30.0,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+        on_health: Optional[Callable[[PooledController], None]] = None,
+    ):
+        """初始化控制器连接池，同一设备地址只保留一个控制器供所有调用方复用"""
+        # 健康探测间隔（秒），为 0 时不进行后台探测
+        self.probe_interval = probe_interval
+        # 单次重连的最大尝试次数，两次尝试间的等待时间从 backoff 秒起逐次翻倍
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.on_health = on_health
+        # 按设备地址固定的最快截图方式，重连时不再重新测速
+        self.pinned_screencap: dict[str, int] = {}
+        self._entries: dict[str, PooledController] = {}
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """同一设备的连接串行执行，避免并发调用创建多个控制器"""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str) -> Optional[PooledController]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def find(self, controller_id: str) -> Optional[PooledController]:
+        with self._lock:
+            return next(
+                (
+                    entry
+                    for entry in self._entries.values()
+                    if entry.controller_id == controller_id
+                ),
+                None,
+            )
+
+    def add(self, entry: PooledController) -> None:
+        with self._lock:
+            self._entries[entry.key] = entry
+            if self._thread is None and self.probe_interval > 0:
+                self._thread = threading.Thread(
+                    target=self._watch, name="maa-mcp-health", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, controller_id: str) -> None:
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.controller_id == controller_id:
+                    del self._entries[key]
+
+    def recover(self, controller_id: str) -> bool:
+        """操作失败后调用：探测连接并在断开时按退避策略重连，返回连接是否可用"""
+        entry = self.find(controller_id)
+        if entry is None:
+            return False
+        return self._check(entry)
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                entries = list(self._entries.values())
+            for entry in entries:
+                self._check(entry)
+
+    def _check(self, entry: PooledController) -> bool:
+        with entry.lock:
+            healthy = self._probe(entry.controller) or self._reconnect(entry)
+            if healthy != entry.healthy:
+                entry.healthy = healthy
+                if self.on_health:
+                    self.on_health(entry)
+            return healthy
+
+    def _probe(self, controller: Controller) -> bool:
+        """低成本探测：ADB 设备执行一条空 shell 命令，其他控制器检查连接状态"""
+        from maa.controller import AdbController
+
+        if not controller.connected:
+            return False
+        if isinstance(controller, AdbController):
+            with stats.span("probe"):
+                return controller.post_shell("echo", PROBE_TIMEOUT_MS).wait().succeeded
+        return True
+
+    def _reconnect(self, entry: PooledController) -> bool:
+        if time.monotonic() < entry.retry_after:
+            return False
+        delay = self.backoff
+        for attempt in range(self.max_attempts):
+            if attempt:
+                time.sleep(delay)
+                delay *= 2
+            with stats.span("reconnect", entry.controller_id):
+                connected = entry.controller.post_connection().wait().succeeded
+            if connected:
+                entry.failures = 0
+                entry.retry_after = 0.0
+                return True
+        # 连续失败时延长下次尝试前的等待时间，避免每次操作都阻塞在重连上
+        entry.failures += 1
+        entry.retry_after = time.monotonic() + delay * 2 ** min(entry.failures, 6)
+        return False
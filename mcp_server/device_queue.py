@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterator, Optional, TypeVar
+
+from mcp_server.stats import stats
+
+T = TypeVar("T")
+
+# 调度优先级，数值越小越先执行：工具调用的截图与操作优先于后台轮询
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# 当前调用的调度优先级，wait_for_* 等轮询类工具在 background() 中执行
+current_priority: ContextVar[int] = ContextVar("current_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """以后台优先级执行其中的设备请求"""
+    token = current_priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class _Queue:
+    def __init__(self):
+        self.cond = threading.Condition()
+        # 等待中的请求 (优先级, 提交序号)
+        self.waiting: list[tuple[int, int]] = []
+        # 当前占用设备的线程及其重入次数
+        self.owner: Optional[int] = None
+        self.depth = 0
+        self.served = 0
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class DeviceQueue:
+    def __init__(self):
+        """
+        初始化设备请求队列：每个设备同一时间只执行一个截图或操作
+
+        等待中的请求按优先级、再按提交顺序执行；同时发起的相同读取请求只执行一次。
+        """
+        self._queues: dict[str, _Queue] = {}
+        self._flights: dict[Hashable, _Flight] = {}
+        self._sequence = itertools.count()
+        self._coalesced = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, key: str, priority: Optional[int] = None) -> Iterator[None]:
+        """独占设备，同一线程可重入；等待时间计入 queue 阶段耗时"""
+        queue = self._queue(key)
+        thread_id = threading.get_ident()
+        with queue.cond:
+            if queue.owner == thread_id:
+                queue.depth += 1
+            else:
+                ticket = (
+                    current_priority.get() if priority is None else priority,
+                    next(self._sequence),
+                )
+                heapq.heappush(queue.waiting, ticket)
+                with stats.span("queue", key):
+                    queue.cond.wait_for(
+                        lambda: queue.owner is None and queue.waiting[0] == ticket
+                    )
+                heapq.heappop(queue.waiting)
+                queue.owner, queue.depth = thread_id, 1
+        try:
+            yield
+        finally:
+            with queue.cond:
+                queue.depth -= 1
+                if queue.depth == 0:
+                    queue.owner = None
+                    queue.served += 1
+                    queue.cond.notify_all()
+
+    def coalesce(self, key: Hashable, func: Callable[[], T]) -> T:
+        """相同 key 的请求正在执行时等待并共用其结果，否则执行 func"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            flight.result = func()
+            return flight.result
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def forget(self, key: str) -> None:
+        """移除空闲设备的队列，在控制器释放时调用"""
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is not None and queue.owner is None and not queue.waiting:
+                del self._queues[key]
+
+    def summary(self) -> dict[str, Any]:
+        """各设备的排队请求数、是否正在执行及已执行请求数，以及被合并的请求数"""
+        with self._lock:
+            queues = dict(self._queues)
+            coalesced = self._coalesced
+        devices = {}
+        for key, queue in queues.items():
+            with queue.cond:
+                devices[key] = {
+                    "depth": len(queue.waiting),
+                    "busy": queue.owner is not None,
+                    "served": queue.served,
+                }
+        return {"devices": devices, "coalesced": coalesced}
+
+    def _queue(self, key: str) -> _Queue:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None:
+                queue = self._queues[key] = _Queue()
+            return queue
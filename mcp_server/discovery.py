@@ -0,0 +1,162 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Optional
+
+from mcp_server.stats import stats
+
+# 保留的设备增删事件数
+MAX_EVENTS = 256
+
+
+@dataclass
+class DeviceRecord:
+    name: str
+    kind: str
+    obj: Any
+    first_seen: float
+    last_seen: float
+    online: bool = True
+    # 最近一次连接是否成功，尚未连接过时为 None
+    healthy: Optional[bool] = None
+
+
+@dataclass
+class Scanner:
+    kind: str
+    scan: Callable[[], Iterable[Any]]
+    name_of: Callable[[Any], str]
+
+
+class DiscoveryService:
+    def __init__(
+        self,
+        scanners: list[Scanner],
+        interval: float,
+        on_added: Optional[Callable[[DeviceRecord], None]] = None,
+        on_removed: Optional[Callable[[DeviceRecord], None]] = None,
+    ):
+        """初始化设备发现服务，interval 为后台扫描间隔（秒），为 0 时仅按需扫描"""
+        self.scanners = {scanner.kind: scanner for scanner in scanners}
+        self.interval = interval
+        self.on_added = on_added
+        self.on_removed = on_removed
+        self._records: dict[tuple[str, str], DeviceRecord] = {}
+        self._scanned: set[str] = set()
+        self._events: deque[dict[str, Any]] = deque(maxlen=MAX_EVENTS)
+        self._sequence = 0
+        self._lock = threading.Lock()
+        # 同一类设备的扫描串行执行，并发请求共用同一次扫描结果
+        self._scan_locks = {kind: threading.Lock() for kind in self.scanners}
+        self._pool = ThreadPoolExecutor(
+            max_workers=len(self.scanners), thread_name_prefix="maa-mcp-discovery"
+        )
+        self._thread: Optional[threading.Thread] = None
+
+    def ensure_started(self) -> None:
+        """首次使用时启动后台扫描线程，避免服务启动时就执行耗时的设备扫描"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._watch, name="maa-mcp-discovery-watch", daemon=True
+            )
+            self._thread.start()
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            self.scan_all()
+
+    def scan_all(self) -> None:
+        """并行扫描所有类型的设备"""
+        futures = [self._pool.submit(self.scan, kind) for kind in self.scanners]
+        for future in futures:
+            future.result()
+
+    def scan(self, kind: str) -> list[DeviceRecord]:
+        """扫描一类设备并更新设备表，返回在线设备"""
+        scanner = self.scanners[kind]
+        with self._scan_locks[kind]:
+            try:
+                with stats.span("discovery", kind):
+                    found = {scanner.name_of(obj): obj for obj in scanner.scan()}
+            except Exception:
+                # 扫描失败时保留上一次的结果
+                return self.devices(kind)
+            found.pop("", None)
+            self._update(kind, found)
+        return self.devices(kind)
+
+    def _update(self, kind: str, found: dict[str, Any]) -> None:
+        now = time.time()
+        added, removed = [], []
+        with self._lock:
+            for name, obj in found.items():
+                record = self._records.get((kind, name))
+                if record is None or not record.online or record.obj != obj:
+                    if record is None:
+                        record = DeviceRecord(name, kind, obj, now, now)
+                        self._records[(kind, name)] = record
+                    record.obj = obj
+                    record.online = True
+                    added.append(record)
+                record.last_seen = now
+            for (record_kind, name), record in self._records.items():
+                if record_kind == kind and record.online and name not in found:
+                    record.online = False
+                    removed.append(record)
+            for record in added:
+                self._publish("added", record)
+            for record in removed:
+                self._publish("removed", record)
+            self._scanned.add(kind)
+        for record in added:
+            if self.on_added:
+                self.on_added(record)
+        for record in removed:
+            if self.on_removed:
+                self.on_removed(record)
+
+    def _publish(self, event: str, record: DeviceRecord) -> None:
+        self._sequence += 1
+        self._events.append(
+            {
+                "seq": self._sequence,
+                "event": event,
+                "kind": record.kind,
+                "name": record.name,
+                "time": round(time.time(), 3),
+            }
+        )
+
+    def scanned(self, kind: str) -> bool:
+        with self._lock:
+            return kind in self._scanned
+
+    def devices(
+        self, kind: Optional[str] = None, online_only: bool = True
+    ) -> list[DeviceRecord]:
+        with self._lock:
+            return [
+                record
+                for record in self._records.values()
+                if (kind is None or record.kind == kind)
+                and (record.online or not online_only)
+            ]
+
+    def mark_health(self, kind: str, name: str, healthy: bool) -> None:
+        """记录最近一次连接该设备的结果"""
+        with self._lock:
+            record = self._records.get((kind, name))
+            if record is not None:
+                record.healthy = healthy
+
+    def events(self, since: int = 0) -> list[dict[str, Any]]:
+        """返回序号大于 since 的设备增删事件"""
+        with self._lock:
+            return [event for event in self._events if event["seq"] > since]
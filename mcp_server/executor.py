@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Hashable, Optional, TypeVar
+
+from mcp_server.startup import warmup
+
+if TYPE_CHECKING:
+    from maa.job import Job
+
+T = TypeVar("T")
+J = TypeVar("J", bound="Job")
+
+# 有界线程池：MaaFramework 任务的 wait() 与截图编码等阻塞操作均在此执行，避免阻塞事件循环
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("MAA_MCP_MAX_WORKERS", "8")),
+    thread_name_prefix="maa-mcp",
+)
+# 多设备并发调用中尚未结束的对象，每个对象同一时间最多占用一个线程
+_in_flight: set[Hashable] = set()
+_in_flight_lock = threading.Lock()
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """在线程池中执行阻塞函数并等待结果"""
+    loop = asyncio.get_running_loop()
+    # run_in_executor 不会复制上下文变量，需显式传递当前客户端会话等上下文
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor,
+        context.run,
+        functools.partial(_after_warmup, func, *args, **kwargs),
+    )
+
+
+def _after_warmup(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # 后台预热完成前 MaaFramework 尚未初始化，阻塞操作在工作线程中等待预热结束
+    warmup.wait()
+    return func(*args, **kwargs)
+
+
+async def wait_job(job: J) -> J:
+    """在线程池中等待 MaaFramework 任务完成"""
+    await run_blocking(job.wait)
+    return job
+
+
+def dispatch(
+    key: Hashable, func: Callable[..., T], *args: Any
+) -> Optional[asyncio.Future]:
+    """
+    在独立线程中执行阻塞函数，用于多设备并发调用，线程数随设备数增长而不占用共用线程池
+
+    同一 key 的上一次调用尚未结束（如设备卡住）时返回 None，不再为其启动新的线程。
+    """
+    with _in_flight_lock:
+        if key in _in_flight:
+            return None
+        _in_flight.add(key)
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    context = contextvars.copy_context()
+
+    def resolve(result: Any, error: Optional[BaseException]) -> None:
+        # 调用方已超时放弃等待时 future 已被取消
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def worker() -> None:
+        result, error = None, None
+        try:
+            result = context.run(_after_warmup, func, *args)
+        except Exception as exc:
+            error = exc
+        finally:
+            with _in_flight_lock:
+                _in_flight.discard(key)
+        try:
+            loop.call_soon_threadsafe(resolve, result, error)
+        except RuntimeError:
+            # 事件循环已关闭
+            pass
+
+    threading.Thread(target=worker, name="maa-mcp-fan-out", daemon=True).start()
+    return future
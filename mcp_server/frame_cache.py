@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+from mcp_server.screenshot import prepare_image
+from mcp_server.signature import make_signature, signature_changed, to_gray
+from mcp_server.stats import stats
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# 缩略图长边像素数，用于低成本的帧间比较
+THUMBNAIL_LONG_SIDE = 64
+
+
+@dataclass
+class Frame:
+    """一次截图及其用于比较的缩略图与校验图"""
+
+    image: numpy.ndarray
+    thumbnail: numpy.ndarray
+    timestamp: float
+    signature: numpy.ndarray
+
+
+def make_thumbnail(image: numpy.ndarray) -> numpy.ndarray:
+    """将截图缩放为灰度缩略图"""
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = THUMBNAIL_LONG_SIDE / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(to_gray(image), size, interpolation=cv2.INTER_AREA)
+
+
+class FrameCache:
+    def __init__(
+        self,
+        ttl: float = 0.5,
+        pixel_threshold: int = 6,
+        recover: Optional[Callable[[str], bool]] = None,
+    ):
+        """初始化帧缓存，recover 在截图失败时尝试恢复连接，返回 True 时重试一次"""
+        # 缓存帧的有效期（秒），有效期内的重复截图请求直接复用缓存
+        self.ttl = ttl
+        # 缩略图单像素灰度差超过该值即视为画面变化
+        self.pixel_threshold = pixel_threshold
+        self.recover = recover
+        # 每次实际截图后的回调，参数为缓存键与截图，用于会话录制
+        self.on_capture: Optional[Callable[[str, numpy.ndarray], None]] = None
+        self._frames: dict[str, Frame] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, max_age: Optional[float] = None) -> Optional[Frame]:
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            frame = self._frames.get(key)
+        if frame is None or time.monotonic() - frame.timestamp > max_age:
+            return None
+        return frame
+
+    def put(self, key: str, image: numpy.ndarray) -> Frame:
+        frame = Frame(
+            image, make_thumbnail(image), time.monotonic(), make_signature(image)
+        )
+        with self._lock:
+            self._frames[key] = frame
+        return frame
+
+    def capture(
+        self, key: str, controller: Any, max_age: Optional[float] = None
+    ) -> Optional[Frame]:
+        """获取截图，有效期内直接返回缓存帧，否则重新截图并更新缓存"""
+        frame = self.get(key, max_age)
+        if frame is not None:
+            return frame
+        image = self._screencap(key, controller)
+        if image is None and self.recover and self.recover(key):
+            image = self._screencap(key, controller)
+        if image is None:
+            return None
+        if self.on_capture:
+            self.on_capture(key, image)
+        return self.put(key, image)
+
+    def _screencap(self, key: str, controller: Any) -> Optional[numpy.ndarray]:
+        with stats.span("capture", key):
+            image = controller.post_screencap().wait().get()
+        return None if image is None or image.size == 0 else image
+
+    def invalidate(self, key: str) -> None:
+        """使缓存帧失效，在执行点击等会改变画面的操作后调用"""
+        with self._lock:
+            self._frames.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+    def changed(
+        self, old: Optional[Frame], new: Frame, roi: Optional[Sequence[int]] = None
+    ) -> bool:
+        """
+        比较两帧，判断画面是否发生变化；指定 roi 时只比较该区域
+
+        缩略图已有差异时直接判定为变化，否则再比较校验图，避免漏掉小字的变化。
+        """
+        import cv2
+
+        if old is None or old.image.shape != new.image.shape:
+            return True
+        if roi:
+            old_region = prepare_image(old.image, 0, roi)
+            new_region = prepare_image(new.image, 0, roi)
+            if old_region.size == 0:
+                return False
+            return signature_changed(
+                make_signature(old_region), make_signature(new_region)
+            )
+        diff = cv2.absdiff(old.thumbnail, new.thumbnail)
+        if int(diff.max()) > self.pixel_threshold:
+            return True
+        return signature_changed(old.signature, new.signature)
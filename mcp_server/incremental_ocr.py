@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from mcp_server.signature import SIGNATURE_SCALE, SIGNATURE_THRESHOLD, make_signature
+
+if TYPE_CHECKING:
+    import numpy
+
+    from mcp_server.frame_cache import Frame
+
+
+# 分块网格的行列数
+TILE_ROWS = 8
+TILE_COLS = 8
+# 变化区域向外扩展的像素数，避免文字被区域边界截断
+REGION_MARGIN = 16
+# 变化面积超过整帧的该比例时，直接执行整帧 OCR 更划算
+FULL_FRAME_RATIO = 0.5
+
+Region = tuple[int, int, int, int]
+
+
+def changed_tiles(old: numpy.ndarray, new: numpy.ndarray) -> numpy.ndarray:
+    """逐块比较两帧的校验图，返回 TILE_ROWS x TILE_COLS 的布尔矩阵"""
+    import cv2
+    import numpy
+
+    diff = cv2.absdiff(old, new)
+    height, width = diff.shape
+    tiles = numpy.zeros((TILE_ROWS, TILE_COLS), dtype=bool)
+    for row in range(TILE_ROWS):
+        y0, y1 = row * height // TILE_ROWS, (row + 1) * height // TILE_ROWS
+        for col in range(TILE_COLS):
+            x0, x1 = col * width // TILE_COLS, (col + 1) * width // TILE_COLS
+            tile = diff[y0:y1, x0:x1]
+            tiles[row, col] = tile.size > 0 and int(tile.max()) > SIGNATURE_THRESHOLD
+    return tiles
+
+
+def _box_of(result: Any) -> Region:
+    x, y, w, h = result.box
+    return x, y, w, h
+
+
+def _intersects(a: Region, b: Region) -> bool:
+    return (
+        a[0] < b[0] + b[2]
+        and b[0] < a[0] + a[2]
+        and a[1] < b[1] + b[3]
+        and b[1] < a[1] + a[3]
+    )
+
+
+def _union(a: Region, b: Region) -> Region:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _clip(region: Region, width: int, height: int) -> Region:
+    x0, y0 = max(0, region[0]), max(0, region[1])
+    x1 = min(width, region[0] + region[2])
+    y1 = min(height, region[1] + region[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def changed_regions(
+    old: Frame, new: Frame, cached_results: list
+) -> Optional[list[Region]]:
+    """
+    计算需要重新识别的区域
+
+    相邻的变化块合并为一个区域，向外扩展后再扩展到完整覆盖与之相交的历史文本框，
+    保证被部分覆盖的文字能完整重新识别，合并结果时不会丢失这些文字。
+    返回 None 表示变化面积过大，应执行整帧 OCR；返回空列表表示画面无变化。
+    """
+    if old.image.shape != new.image.shape:
+        return None
+    height, width = new.image.shape[:2]
+    tiles = changed_tiles(old.signature, new.signature)
+    if tiles.sum() > FULL_FRAME_RATIO * tiles.size:
+        return None
+
+    import cv2
+    import numpy
+
+    count, labels = cv2.connectedComponents(tiles.astype(numpy.uint8), connectivity=4)
+    regions: list[Region] = []
+    for label in range(1, count):
+        rows, cols = numpy.nonzero(labels == label)
+        x0 = int(cols.min()) * width // TILE_COLS
+        x1 = (int(cols.max()) + 1) * width // TILE_COLS
+        y0 = int(rows.min()) * height // TILE_ROWS
+        y1 = (int(rows.max()) + 1) * height // TILE_ROWS
+        # 先扩展边界，再吸收与扩展后区域相交的历史文本框
+        x0, y0 = max(0, x0 - REGION_MARGIN), max(0, y0 - REGION_MARGIN)
+        x1, y1 = min(width, x1 + REGION_MARGIN), min(height, y1 + REGION_MARGIN)
+        regions.append((x0, y0, x1 - x0, y1 - y0))
+
+    # 吸收文本框或合并重叠区域后区域会变大，重复直到每个相交的文本框都完整落在区域内
+    boxes = [_box_of(result) for result in cached_results]
+    while True:
+        merged: list[Region] = []
+        for region in regions:
+            for box in boxes:
+                if _intersects(region, box):
+                    region = _union(region, box)
+            for other in list(merged):
+                if _intersects(region, other):
+                    merged.remove(other)
+                    region = _union(region, other)
+            merged.append(region)
+        if merged == regions:
+            break
+        regions = merged
+    merged = [_clip(region, width, height) for region in merged]
+
+    if sum(w * h for _, _, w, h in merged) > FULL_FRAME_RATIO * width * height:
+        return None
+    return merged
+
+
+def merge_results(
+    cached_results: list, fresh_results: list, regions: list[Region]
+) -> list:
+    """保留未变化区域内的历史文本框，并与变化区域的新识别结果合并"""
+    kept = [
+        result
+        for result in cached_results
+        if not any(_intersects(_box_of(result), region) for region in regions)
+    ]
+    merged = kept + list(fresh_results)
+    merged.sort(key=lambda result: (result.box[0], result.box[1]))
+    return merged
+
+
+# 滚动偏移估计：取画面首尾各该比例长度的条带在新画面中搜索
+SCROLL_BAND_RATIO = 0.25
+# 条带匹配的最低相关系数，低于该值视为无法确定偏移
+SCROLL_MATCH_THRESHOLD = 0.8
+# 新露出区域向已识别区域扩展的像素数，避免跨越边界的文字只识别到一半
+SCROLL_MARGIN = 48
+
+
+def _crop(image: numpy.ndarray, roi: Optional[Region]) -> numpy.ndarray:
+    if not roi:
+        return image
+    x, y, w, h = roi
+    return image[max(0, y) : y + h, max(0, x) : x + w]
+
+
+def scroll_offset(
+    old: numpy.ndarray, new: numpy.ndarray, axis: int, roi: Optional[Region] = None
+) -> Optional[int]:
+    """
+    估计两帧之间内容沿 axis（0 为纵向，1 为横向）滚动的像素数
+
+    返回正数表示内容向坐标减小的方向移动（新内容从末端露出），负数表示反向；
+    无法确定时（如滚动超过一屏或画面缺少纹理）返回 None。
+    """
+    import cv2
+
+    old_small = make_signature(_crop(old, roi))
+    new_small = make_signature(_crop(new, roi))
+    if old_small.shape != new_small.shape:
+        return None
+    if axis == 1:
+        old_small, new_small = old_small.T.copy(), new_small.T.copy()
+    length = old_small.shape[0]
+    band = max(1, round(length * SCROLL_BAND_RATIO))
+    best_score, best_offset = SCROLL_MATCH_THRESHOLD, None
+    for start in (0, length - band):
+        template = old_small[start : start + band]
+        # 纯色条带在任意位置都能匹配，无法用于估计偏移
+        if float(template.std()) < 2.0:
+            continue
+        scores = cv2.matchTemplate(new_small, template, cv2.TM_CCOEFF_NORMED)
+        _, score, _, location = cv2.minMaxLoc(scores)
+        if score >= best_score:
+            best_score, best_offset = score, start - location[1]
+    if best_offset is None:
+        return None
+    return round(best_offset / SIGNATURE_SCALE)
+
+
+def revealed_region(
+    shape: tuple[int, ...], roi: Optional[Region], offset: int, axis: int
+) -> Region:
+    """根据滚动偏移计算新露出的区域（含 SCROLL_MARGIN），返回图像坐标"""
+    height, width = shape[:2]
+    x, y, w, h = roi or (0, 0, width, height)
+    length = h if axis == 0 else w
+    size = min(length, abs(offset) + SCROLL_MARGIN)
+    start = length - size if offset > 0 else 0
+    if axis == 0:
+        return x, y + start, w, size
+    return x + start, y, size, h
@@ -0,0 +1,94 @@
+import json
+from pathlib import Path
+from typing import Any, Optional
+
+try:
+    import jsonc
+except ModuleNotFoundError:
+    # 未安装 json-with-comments 时仅支持不含注释的 interface.json
+    jsonc = None
+
+
+def find_interface(bundle_path: Path) -> Optional[Path]:
+    """在资源包目录及其上一级目录中查找 interface.json"""
+    for directory in (bundle_path, bundle_path.parent):
+        path = directory / "interface.json"
+        if path.is_file():
+            return path
+    return None
+
+
+def load_interface(path: Path) -> Optional[dict[str, Any]]:
+    try:
+        text = path.read_text(encoding="utf-8")
+        return jsonc.loads(text) if jsonc else json.loads(text)
+    except (OSError, ValueError):
+        return None
+
+
+def merge_override(base: dict[str, Any], override: dict[str, Any]) -> dict[str, Any]:
+    """递归合并 pipeline_override，后者的同名字段覆盖前者"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_override(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def describe_tasks(interface: dict[str, Any]) -> list[dict[str, Any]]:
+    """列出 interface.json 中的任务及其可选项，供大模型选择预设"""
+    options = interface.get("option", {})
+    tasks = []
+    for task in interface.get("task", []):
+        task_options = {}
+        for name in task.get("option", []):
+            option = options.get(name, {})
+            cases = [case["name"] for case in option.get("cases", [])]
+            task_options[name] = {
+                "cases": cases,
+                "default": option.get("default_case", cases[0] if cases else None),
+            }
+        tasks.append(
+            {"name": task["name"], "entry": task["entry"], "options": task_options}
+        )
+    return tasks
+
+
+def resolve_task(
+    interface: Optional[dict[str, Any]],
+    task_name: str,
+    selected: Optional[dict[str, str]] = None,
+) -> Optional[tuple[str, dict[str, Any]]]:
+    """
+    将任务名解析为入口节点与合并后的 pipeline_override
+
+    task_name 可以是 interface.json 中任务的 name 或 entry；未在 interface.json 中定义时，
+    视为 pipeline 节点名直接执行。未指定的选项使用 default_case，缺省为第一个选项值。
+    选项或选项值不存在时返回 None。
+    """
+    selected = selected or {}
+    tasks = interface.get("task", []) if interface else []
+    task = next(
+        (task for task in tasks if task_name in (task["name"], task["entry"])), None
+    )
+    if task is None:
+        return (task_name, {}) if not selected else None
+
+    task_options = task.get("option", [])
+    if set(selected) - set(task_options):
+        return None
+    override = task.get("pipeline_override", {})
+    options = interface.get("option", {})
+    for name in task_options:
+        option = options.get(name, {})
+        cases = option.get("cases", [])
+        if not cases:
+            return None
+        case_name = selected.get(name, option.get("default_case", cases[0]["name"]))
+        case = next((case for case in cases if case["name"] == case_name), None)
+        if case is None:
+            return None
+        override = merge_override(override, case.get("pipeline_override", {}))
+    return task["entry"], override
@@ -1,31 +1,142 @@
+from __future__ import annotations
+
+import asyncio
 import atexit
+import math
+import os
+import re
+import threading
 import time
-from datetime import datetime
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Optional
 
-import cv2
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_context
 
-from maa.define import (
-    MaaWin32InputMethodEnum,
-    MaaWin32ScreencapMethodEnum,
+from mcp_server.controller_pool import (
+    ControllerPool,
+    PooledController,
+    benchmark_screencap,
+)
+from mcp_server.device_queue import DeviceQueue, background
+from mcp_server.discovery import DeviceRecord, DiscoveryService, Scanner
+from mcp_server.executor import dispatch, run_blocking
+from mcp_server.frame_cache import Frame, FrameCache
+from mcp_server.incremental_ocr import (
+    changed_regions,
+    merge_results,
+    revealed_region,
+    scroll_offset,
+)
+from mcp_server.interface import (
+    describe_tasks,
+    find_interface,
+    load_interface,
+    merge_override,
+    resolve_task,
+)
+from mcp_server.nav_graph import (
+    NavigationGraph,
+    ScreenState,
+    Transition,
+    screen_anchors,
+)
+from mcp_server.ocr_cache import OcrResultCache, perceptual_hash
+from mcp_server.ocr_format import (
+    best_match,
+    compact_result,
+    filter_results,
+    scale_results,
 )
-from maa.toolkit import DesktopWindow, Toolkit
-from maa.controller import AdbController, Win32Controller
-from maa.resource import Resource
-from maa.tasker import Tasker, TaskDetail
-from maa.pipeline import JRecognitionType, JOCR
-
 from mcp_server.registry import ObjectRegistry
+from mcp_server.resource_cache import ResourceCache, bundle_fingerprint
+from mcp_server.screenshot import ScreenshotStore, prepare_image
+from mcp_server.session_log import SessionRecorder, load_frame, read_events
+from mcp_server.sessions import (
+    DeviceLeases,
+    SessionMiddleware,
+    SessionTracker,
+    current_session,
+)
+from mcp_server.startup import warmup
+from mcp_server.stats import stats
+from mcp_server.subscriptions import MAX_INTERVAL, MIN_INTERVAL, ScreenSubscription
+from mcp_server.template_index import TemplateIndex
+
+# MaaFramework 会加载动态库与 OpenCV，耗时较长，在预热或首次使用时才导入
+if TYPE_CHECKING:
+    from maa.controller import AdbController, Controller
+    from maa.job import TaskJob
+    from maa.pipeline import JOCR
+    from maa.resource import Resource
+    from maa.tasker import Tasker, TaskDetail
+    from maa.toolkit import DesktopWindow
 
 object_registry = ObjectRegistry()
-# 记录当前会话保存的截图文件路径，用于退出时清理
-_saved_screenshots: list[Path] = []
+# 按资源包路径与内容指纹缓存已加载的资源，避免重复加载 OCR 模型
+resource_cache = ResourceCache()
+# 截图文件的保留队列，超出数量或总大小上限时删除最早的截图，退出时全部清理
+screenshot_store = ScreenshotStore(
+    Path(__file__).parent / "screenshots",
+    max_files=int(os.environ.get("MAA_MCP_SCREENSHOT_MAX_FILES", "50")),
+    max_bytes=int(os.environ.get("MAA_MCP_SCREENSHOT_MAX_MB", "200")) * 1024 * 1024,
+    encode_workers=int(os.environ.get("MAA_MCP_ENCODE_WORKERS", "8")),
+)
+# 加载资源时预先解码 image 目录下的模板，供 find_image 按名称匹配
+template_index = TemplateIndex()
+# 控制器连接池：同一设备只保留一个控制器，定期探测连接并在断开时自动重连
+controller_pool = ControllerPool(
+    probe_interval=float(os.environ.get("MAA_MCP_HEALTH_INTERVAL", "30")),
+    max_attempts=int(os.environ.get("MAA_MCP_RECONNECT_ATTEMPTS", "3")),
+)
+# 开启后首次连接 ADB 设备时逐一测试可用的截图方式并固定使用最快的一种（默认关闭）
+_screencap_benchmark = os.environ.get("MAA_MCP_SCREENCAP_BENCHMARK", "0") != "0"
+# 按控制器 ID 缓存最近一次截图，ocr 与 screencap 在有效期内共用同一帧
+frame_cache = FrameCache(
+    ttl=float(os.environ.get("MAA_MCP_FRAME_CACHE_TTL", "0.5")),
+    recover=controller_pool.recover,
+)
+# 按设备排队执行截图与操作，工具调用优先于后台轮询，同时发起的相同截图、识别只执行一次
+device_queue = DeviceQueue()
+# 记录任务管理器绑定的控制器 ID，用于定位帧缓存
+_tasker_controllers: dict[str, str] = {}
+# 记录任务管理器绑定的资源 ID，用于查找模板索引
+_tasker_resources: dict[str, str] = {}
+# 记录每个任务管理器最近一次 OCR 所用的帧、结果及识别范围，画面与范围均未变化时直接复用
+_ocr_snapshots: dict[str, tuple[Frame, list, tuple]] = {}
+# OCR 结果缓存：同一资源对近乎相同的画面区域只识别一次，可选在服务重启间持久化
+_ocr_cache_file = os.environ.get("MAA_MCP_OCR_CACHE_FILE")
+ocr_cache = OcrResultCache(
+    max_entries=int(os.environ.get("MAA_MCP_OCR_CACHE_SIZE", "256")),
+    path=Path(_ocr_cache_file) if _ocr_cache_file else None,
+)
+# 画面导航图：记录识别出的画面状态及画面之间的切换操作，供 navigate_to 按已知路径导航
+_nav_graph_file = os.environ.get("MAA_MCP_NAV_GRAPH_FILE")
+nav_graph = NavigationGraph(Path(_nav_graph_file) if _nav_graph_file else None)
+# 每个控制器最近一次识别出的画面状态 ID 及对应的帧，以及此后已执行、尚未观察到结果的操作
+_screen_states: dict[str, tuple[str, Frame]] = {}
+_pending_actions: dict[str, list[dict]] = {}
+_nav_lock = threading.Lock()
+# 多客户端共用服务时记录各客户端会话的活跃时间，会话结束后收回其对象
+session_tracker = SessionTracker()
+# 设备租约：客户端在设备上执行操作后的一段时间内（秒）独占该设备，为 0 时不仲裁
+device_leases = DeviceLeases(float(os.environ.get("MAA_MCP_DEVICE_LEASE", "30")))
+
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP) -> AsyncIterator[None]:
+    # 完成 MCP 握手前不执行耗时的初始化，由后台线程预热
+    warmup.start()
+    yield
+
 
 mcp = FastMCP(
     "MAA MCP",
     version="1.0.0",
+    lifespan=_lifespan,
     instructions="""
     MAA MCP 是一个基于 MaaFramewok 框架的 Model Context Protocol 服务，
     提供 Android 设备、Windows 桌面自动化控制能力，支持通过 ADB 连接模拟器或真机，通过窗口句柄连接Windows桌面
@@ -52,14 +163,18 @@ mcp = FastMCP(
        - 将控制器与资源绑定，获取任务管理器 ID
 
     5. 自动化执行循环
-       - 调用 ocr(tasker_id) 进行屏幕截图并执行 OCR 识别
+       - 调用 ocr(tasker_id) 进行屏幕截图并执行 OCR 识别（推荐 compact=True 以减少返回数据量）
+       - 仅需定位某段文字时，调用 find_text(tasker_id, text_pattern) 直接获取点击坐标
+       - 定位无文字的图标、按钮时，调用 find_image(tasker_id, templates) 按资源包中的模板图片匹配
        - 根据识别结果调用 click() 或 swipe() 执行相应操作
+       - 操作后需要等待界面响应时，优先使用 wait_for_text() / wait_for_change() / wait_for_stable()，而非固定时长的 wait()
        - 重复执行步骤 5，直至任务完成
+       - 资源包中已有的确定性流程（可通过 list_tasks() 查询）应直接调用 run_task() 交给 pipeline 执行
 
     屏幕识别策略（重要）：
     - 优先使用 OCR：始终优先调用 ocr() 进行文字识别，OCR 返回结构化文本数据，token 消耗极低
     - 按需使用截图：仅当以下情况时，才调用 screencap() 获取截图，再通过 read_file 读取图片进行视觉识别：
-      1. OCR 结果不足以做出决策（如需要识别图标、图像、颜色、布局等非文字信息）
+      1. OCR 与 find_image() 均不足以做出决策（如需要识别颜色、布局等信息，或图标没有对应模板）
       2. 反复 OCR + 操作后界面状态无预期变化，可能存在弹窗、遮挡或其他视觉异常需要人工判断
     - 图片识别会消耗大量 token，应尽量避免频繁调用
 
@@ -76,14 +191,127 @@ mcp = FastMCP(
     - 严禁绕过本 MCP 工具自行实现设备控制逻辑
     """,
 )
+mcp.add_middleware(SessionMiddleware(session_tracker))
+
+
+def _init_toolkit() -> None:
+    from maa.toolkit import Toolkit
+
+    Toolkit.init_option(Path(__file__).parent)
+
+
+def _import_opencv() -> None:
+    import cv2  # noqa: F401
+
+
+def _preload_resource() -> None:
+    # 启动后预先加载常用资源包，首次调用 load_resource 时直接命中缓存
+    path = os.environ.get("MAA_MCP_PRELOAD_RESOURCE")
+    if path and _load_resource(path) is None:
+        raise RuntimeError(f"failed to load resource: {path}")
+
+
+warmup.add_step("toolkit", _init_toolkit)
+warmup.add_step("opencv", _import_opencv)
+warmup.add_step("resource", _preload_resource)
+warmup.add_step("ocr_cache", ocr_cache.load)
+warmup.add_step("nav_graph", nav_graph.load)
+warmup.verbose = os.environ.get("MAA_MCP_STARTUP_TIMING", "0") != "0"
+
+
+def _evict_idle_objects(ttl: float) -> None:
+    """后台定期释放长时间未使用的任务管理器、控制器与资源"""
+    while True:
+        time.sleep(min(ttl, 60.0))
+        object_registry.evict_idle(ttl, ("tasker", "controller", "resource"))
+
+
+# 空闲对象的回收时间（秒），为 0 时不自动回收
+_idle_ttl = float(os.environ.get("MAA_MCP_IDLE_TTL", "1800"))
+if _idle_ttl > 0:
+    threading.Thread(
+        target=_evict_idle_objects, args=(_idle_ttl,), name="maa-mcp-evict", daemon=True
+    ).start()
+
+
+def _expire_sessions(ttl: float) -> None:
+    """后台定期结束长时间未调用工具的客户端会话，释放仅由该会话使用的对象及其设备租约"""
+    while True:
+        time.sleep(min(ttl, 60.0))
+        for session_id in session_tracker.expire(ttl):
+            object_registry.end_session(
+                session_id, ("tasker", "controller", "resource")
+            )
+            device_leases.release_session(session_id)
+
+
+# 客户端会话的过期时间（秒），为 0 时不回收
+_session_ttl = float(os.environ.get("MAA_MCP_SESSION_TTL", "1800"))
+if _session_ttl > 0:
+    threading.Thread(
+        target=_expire_sessions,
+        args=(_session_ttl,),
+        name="maa-mcp-sessions",
+        daemon=True,
+    ).start()
+
+
+def _on_device_added(record: DeviceRecord) -> None:
+    object_registry.register_by_name(record.name, record.obj, record.kind)
+
+
+def _on_device_removed(record: DeviceRecord) -> None:
+    object_registry.release(record.name, record.kind)
+
+
+def _find_adb_devices() -> list:
+    from maa.toolkit import Toolkit
+
+    return Toolkit.find_adb_devices()
+
+
+def _find_desktop_windows() -> list:
+    from maa.toolkit import Toolkit
+
+    return Toolkit.find_desktop_windows()
+
+
+# 后台设备发现：首次调用设备列表工具后按间隔并行扫描 ADB 设备与窗口，为 0 时仅按需扫描
+discovery = DiscoveryService(
+    [
+        Scanner("device", _find_adb_devices, lambda device: device.name),
+        Scanner("window", _find_desktop_windows, lambda window: window.window_name),
+    ],
+    interval=float(os.environ.get("MAA_MCP_DISCOVERY_INTERVAL", "15")),
+    on_added=_on_device_added,
+    on_removed=_on_device_removed,
+)
+
+
+def _on_controller_health(entry: PooledController) -> None:
+    discovery.mark_health(entry.kind, entry.name, entry.healthy)
 
-Toolkit.init_option(Path(__file__).parent)
+
+controller_pool.on_health = _on_controller_health
+
+
+async def _discover(kind: str, refresh: bool) -> list[str]:
+    discovery.ensure_started()
+    if refresh or not discovery.scanned(kind):
+        records = await run_blocking(discovery.scan, kind)
+    else:
+        records = discovery.devices(kind)
+    return [record.name for record in records]
 
 
 @mcp.tool(
     name="find_adb_device_list",
     description="""
-    扫描并枚举当前系统中所有可用的 ADB 设备。
+    枚举当前系统中所有可用的 ADB 设备。
+    设备列表由后台定期扫描并缓存，默认立即返回缓存结果。
+
+    参数：
+    - refresh: 是否立即重新扫描（可选，默认 False），刚启动模拟器或插入设备时使用
 
     返回值类型：
     - 设备名称列表
@@ -93,18 +321,19 @@ Toolkit.init_option(Path(__file__).parent)
     严禁在未获得用户确认的情况下自动选择设备。
 """,
 )
-def find_adb_device_list() -> list[str]:
-    device_list = Toolkit.find_adb_devices()
-    for device in device_list:
-        object_registry.register_by_name(device.name, device)
-
-    return [device.name for device in device_list]
+@stats.timed_tool
+async def find_adb_device_list(refresh: bool = False) -> list[str]:
+    return await _discover("device", refresh)
 
 
 @mcp.tool(
     name="find_window_list",
     description="""
-    扫描并枚举当前系统中所有可用的窗口。
+    枚举当前系统中所有可用的窗口。
+    窗口列表由后台定期扫描并缓存，默认立即返回缓存结果。
+
+    参数：
+    - refresh: 是否立即重新扫描（可选，默认 False），刚打开目标窗口时使用
 
     返回值类型：
     - 窗口名称列表
@@ -114,11 +343,57 @@ def find_adb_device_list() -> list[str]:
     严禁在未获得用户确认的情况下自动选择窗口。
     """,
 )
-def find_window_list() -> list[str]:
-    window_list = Toolkit.find_desktop_windows()
-    for window in window_list:
-        object_registry.register_by_name(window.window_name, window)
-    return [window.window_name for window in window_list if window.window_name]
+@stats.timed_tool
+async def find_window_list(refresh: bool = False) -> list[str]:
+    return await _discover("window", refresh)
+
+
+@mcp.tool(
+    name="list_devices",
+    description="""
+    查看设备发现服务缓存的设备表，包含已离线的设备。
+
+    参数：
+    - kind: 设备类型（可选），"device" 为 ADB 设备，"window" 为窗口，缺省时返回全部
+
+    返回值：
+    - 设备列表，每项包含：
+      - name: 设备或窗口名称
+      - kind: device / window
+      - online: 最近一次扫描是否仍然存在
+      - last_seen: 最近一次被扫描到的时间（Unix 时间戳）
+      - healthy: 最近一次连接是否成功，尚未连接过时为 None
+    """,
+)
+@stats.timed_tool
+async def list_devices(kind: Optional[str] = None) -> list[dict]:
+    return [
+        {
+            "name": record.name,
+            "kind": record.kind,
+            "online": record.online,
+            "last_seen": round(record.last_seen, 3),
+            "healthy": record.healthy,
+        }
+        for record in discovery.devices(kind, online_only=False)
+    ]
+
+
+@mcp.tool(
+    name="get_device_events",
+    description="""
+    获取设备发现服务记录的设备上线、下线事件，用于感知模拟器启动、设备断开等变化。
+
+    参数：
+    - since: 仅返回序号大于该值的事件（可选，默认 0），传入上次返回的最大 seq 即可增量获取
+
+    返回值：
+    - 事件列表，每项包含 seq（序号）、event（added / removed）、kind、name、time
+    """,
+)
+@stats.timed_tool
+async def get_device_events(since: int = 0) -> list[dict]:
+    return discovery.events(since)
 
 
 @mcp.tool(
@@ -129,13 +404,14 @@ def find_window_list() -> list[str]:
     注意：由于客户端超时限制，单次等待最长支持 60 秒。如果需要等待更长时间，请多次调用。
     """,
 )
-def wait(seconds: float) -> str:
+@stats.timed_tool
+async def wait(seconds: float) -> str:
     max_wait = 60.0
     if seconds > max_wait:
-        time.sleep(max_wait)
+        await asyncio.sleep(max_wait)
         return f"已等待 {max_wait} 秒（单次最大限制）。请再次调用 wait 以继续等待剩余时间。"
-    
-    time.sleep(seconds)
+
+    await asyncio.sleep(seconds)
     return f"已等待 {seconds} 秒"
 
 
@@ -153,23 +429,75 @@ def wait(seconds: float) -> str:
 
     说明：
     控制器 ID 将用于后续的点击、滑动、截图等操作，请妥善保存。
+    同一设备重复连接时返回已有的控制器 ID；连接断开时会自动重连，无需重新调用。
 """,
 )
-def connect_adb_device(device_name: str) -> Optional[str]:
-    device = object_registry.get(device_name)
+@stats.timed_tool
+async def connect_adb_device(device_name: str) -> Optional[str]:
+    device = object_registry.get(device_name, "device")
     if not device:
         return None
+    return await run_blocking(_connect_adb_device, device_name, device)
+
+
+def _connect_adb_device(device_name: str, device: Any) -> Optional[str]:
+    from maa.controller import AdbController
+
+    key = f"adb:{device.adb_path}:{device.address}"
+    with controller_pool.key_lock(key):
+        controller_id = _pooled_controller(key)
+        if controller_id is not None:
+            return controller_id
+
+        def create(screencap_methods: int) -> AdbController:
+            return AdbController(
+                device.adb_path,
+                device.address,
+                screencap_methods,
+                device.input_methods,
+                device.config,
+            )
+
+        method = controller_pool.pinned_screencap.get(key)
+        if method is None and _screencap_benchmark:
+            with stats.span("screencap_benchmark", device_name):
+                method = benchmark_screencap(create, device.screencap_methods)
+            if method is not None:
+                controller_pool.pinned_screencap[key] = method
+        adb_controller = create(method or device.screencap_methods)
+        connected = adb_controller.post_connection().wait().succeeded
+        discovery.mark_health("device", device_name, connected)
+        if not connected:
+            return None
+        return _add_pooled_controller(key, device_name, "device", adb_controller)
+
+
+def _pooled_controller(key: str) -> Optional[str]:
+    """
+    返回连接池中该设备仍可用的控制器 ID，并允许当前会话使用该控制器
+
+    重连已放弃的控制器移出连接池不再复用，由调用方重新建立连接；
+    已在使用它的会话仍可正常释放，无人使用后由空闲回收注销。
+    """
+    entry = controller_pool.get(key)
+    if entry is None:
+        return None
+    if not controller_pool.recover(entry.controller_id):
+        controller_pool.remove(entry.controller_id)
+        return None
+    if not object_registry.grant(entry.controller_id, "controller"):
+        return None
+    return entry.controller_id
+
 
-    adb_controller = AdbController(
-        device.adb_path,
-        device.address,
-        device.screencap_methods,
-        device.input_methods,
-        device.config,
+def _add_pooled_controller(
+    key: str, name: str, kind: str, controller: Controller
+) -> str:
+    controller_id = object_registry.register(
+        controller, "controller", on_release=_release_controller
     )
-    if not adb_controller.post_connection().wait().succeeded:
-        return None
-    return object_registry.register(adb_controller)
+    controller_pool.add(PooledController(key, name, kind, controller_id, controller))
+    return controller_id
 
 
 @mcp.tool(
@@ -186,22 +514,38 @@ def connect_adb_device(device_name: str) -> Optional[str]:
     
     说明：
     窗口控制器 ID 将用于后续的点击、滑动、截图等操作，请妥善保存。
+    同一窗口重复连接时返回已有的控制器 ID。
     """,
 )
-def connect_window(window_name: str) -> Optional[str]:
-    window: DesktopWindow | None = object_registry.get(window_name)
+@stats.timed_tool
+async def connect_window(window_name: str) -> Optional[str]:
+    window: DesktopWindow | None = object_registry.get(window_name, "window")
     if not window:
         return None
+    return await run_blocking(_connect_window, window_name, window)
 
-    window_controller = Win32Controller(
-        window.hwnd,
-        screencap_method=MaaWin32ScreencapMethodEnum.FramePool,
-        mouse_method=MaaWin32InputMethodEnum.PostMessage,
-        keyboard_method=MaaWin32InputMethodEnum.PostMessage,
-    )
-    if not window_controller.post_connection().wait().succeeded:
-        return None
-    return object_registry.register(window_controller)
+
+def _connect_window(window_name: str, window: DesktopWindow) -> Optional[str]:
+    from maa.controller import Win32Controller
+    from maa.define import MaaWin32InputMethodEnum, MaaWin32ScreencapMethodEnum
+
+    key = f"win32:{window.hwnd}"
+    with controller_pool.key_lock(key):
+        controller_id = _pooled_controller(key)
+        if controller_id is not None:
+            return controller_id
+
+        window_controller = Win32Controller(
+            window.hwnd,
+            screencap_method=MaaWin32ScreencapMethodEnum.FramePool,
+            mouse_method=MaaWin32InputMethodEnum.PostMessage,
+            keyboard_method=MaaWin32InputMethodEnum.PostMessage,
+        )
+        connected = window_controller.post_connection().wait().succeeded
+        discovery.mark_health("window", window_name, connected)
+        if not connected:
+            return None
+        return _add_pooled_controller(key, window_name, "window", window_controller)
 
 
 @mcp.tool(
@@ -214,6 +558,7 @@ def connect_window(window_name: str) -> Optional[str]:
       - 路径应指向包含 resource/model/*.onnx 的目录层级
       - 典型路径示例：项目根目录下的 assets/resource
       - 传入路径为 resource 这一级目录，而非其子目录
+    - image 子目录下的图片会被预先加载为模板，供 find_image() 使用
 
     返回值：
     - 成功：返回资源 ID（字符串），用于创建任务管理器
@@ -221,15 +566,82 @@ def connect_window(window_name: str) -> Optional[str]:
 
     前置检查：
     调用前应验证路径存在性，若路径不存在，需提示用户先配置资源文件。
+
+    说明：
+    同一资源包重复加载时直接返回已加载的资源 ID；资源包文件发生变化时会自动重新加载，
+    资源 ID 保持不变，已创建的任务管理器随之使用新资源。重新加载失败时返回 None，原资源继续可用。
 """,
 )
-def load_resource(resource_path: str) -> Optional[str]:
-    if not Path(resource_path).exists():
+@stats.timed_tool
+async def load_resource(resource_path: str) -> Optional[str]:
+    return await run_blocking(_load_resource, resource_path)
+
+
+def _load_resource(resource_path: str) -> Optional[str]:
+    path = Path(resource_path)
+    if not path.exists():
         return None
+    key = str(path.resolve())
+    with resource_cache.path_lock(key):
+        fingerprint = bundle_fingerprint(path)
+        cached = resource_cache.get(key)
+        # 其他会话已加载的资源直接共用
+        if cached and object_registry.grant(cached.resource_id, "resource"):
+            if cached.fingerprint == fingerprint:
+                return cached.resource_id
+            # 资源包已变化：加载到新的资源对象，成功后再替换，失败时保留原资源
+            return _reload_resource(cached.resource_id, key, path, fingerprint)
+
+        from maa.resource import Resource
+
+        resource = Resource()
+        if not resource.post_bundle(key).wait().succeeded:
+            return None
+        resource_id = object_registry.register(
+            resource, "resource", on_release=_release_resource
+        )
+        template_index.build(resource_id, resource, path)
+        resource_cache.put(key, resource_id, fingerprint)
+        return resource_id
+
+
+def _reload_resource(
+    resource_id: str, key: str, path: Path, fingerprint: str
+) -> Optional[str]:
+    """
+    热重载资源：新资源加载成功后沿用原资源 ID，并将已绑定的任务管理器改绑到新资源
+
+    加载失败时返回 None，原资源及其缓存信息保持不变，已绑定的任务管理器不受影响。
+    """
+    from maa.resource import Resource
+
     resource = Resource()
-    if not resource.post_bundle(resource_path).wait().succeeded:
+    if not resource.post_bundle(key).wait().succeeded:
+        return None
+    if not object_registry.replace(resource_id, resource, "resource"):
         return None
-    return object_registry.register(resource)
+    template_index.build(resource_id, resource, path)
+    resource_cache.put(key, resource_id, fingerprint)
+    # 资源由多个会话共用，改绑所有会话的任务管理器
+    token = current_session.set(None)
+    try:
+        for tasker_id, bound_id in list(_tasker_resources.items()):
+            controller_id = _tasker_controllers.get(tasker_id)
+            if bound_id != resource_id or controller_id in _running_tasks:
+                # 正在执行 pipeline 任务的任务管理器继续使用原资源
+                continue
+            controller = object_registry.get(controller_id, "controller")
+            with object_registry.use(tasker_id, "tasker") as tasker:
+                if tasker and controller:
+                    tasker.bind(resource, controller)
+    finally:
+        current_session.reset(token)
+    return resource_id
+
+
+def _release_resource(resource_id: str, resource: Resource) -> None:
+    resource_cache.forget(resource_id)
+    template_index.forget(resource_id)
 
 
 @mcp.tool(
@@ -249,17 +661,148 @@ def load_resource(resource_path: str) -> Optional[str]:
     任务管理器是执行 OCR 识别等自动化操作的核心组件，需确保控制器和资源均已成功初始化。
 """,
 )
-def create_tasker(controller_id: str, resource_id: str) -> Optional[str]:
-    controller = object_registry.get(controller_id)
-    resource = object_registry.get(resource_id)
+@stats.timed_tool
+async def create_tasker(controller_id: str, resource_id: str) -> Optional[str]:
+    return await run_blocking(_create_tasker, controller_id, resource_id)
+
+
+def _create_tasker(controller_id: str, resource_id: str) -> Optional[str]:
+    controller = object_registry.get(controller_id, "controller")
+    resource = object_registry.get(resource_id, "resource")
     if not controller or not resource:
         return None
+    tasker = _new_tasker(resource, controller)
+    if tasker is None:
+        return None
+
+    tasker_id = object_registry.register(
+        tasker,
+        "tasker",
+        depends_on=(controller_id, resource_id),
+        on_release=_release_tasker,
+    )
+    _tasker_controllers[tasker_id] = controller_id
+    _tasker_resources[tasker_id] = resource_id
+    return tasker_id
+
+
+def _new_tasker(resource: Resource, controller: Controller) -> Optional[Tasker]:
+    from maa.tasker import Tasker
+
     tasker = Tasker()
     tasker.bind(resource, controller)
-    if not tasker.inited:
-        return None
+    return tasker if tasker.inited else None
+
+
+def _release_controller(controller_id: str, controller: Controller) -> None:
+    controller_pool.remove(controller_id)
+    device_leases.release(controller_id)
+    device_queue.forget(controller_id)
+    stats.forget_device(controller_id)
+    frame_cache.invalidate(controller_id)
+    with _nav_lock:
+        _screen_states.pop(controller_id, None)
+        _pending_actions.pop(controller_id, None)
+
+
+def _release_tasker(tasker_id: str, tasker: Tasker) -> None:
+    _tasker_controllers.pop(tasker_id, None)
+    _tasker_resources.pop(tasker_id, None)
+    for task_run_id, run in list(_task_runs.items()):
+        if run.tasker_id == tasker_id:
+            del _task_runs[task_run_id]
+    _ocr_snapshots.pop(tasker_id, None)
+    stats.forget_device(tasker_id)
+    if tasker.running:
+        tasker.post_stop().wait()
+
+
+@mcp.tool(
+    name="release_tasker",
+    description="""
+    释放任务管理器，停止其正在执行的任务并回收相关内存。
+
+    参数：
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（ID 无效或任务管理器正在被使用）
+    """,
+)
+@stats.timed_tool
+async def release_tasker(tasker_id: str) -> bool:
+    return await run_blocking(object_registry.release, tasker_id, "tasker")
+
+
+@mcp.tool(
+    name="release_controller",
+    description="""
+    释放控制器，断开与设备或窗口的连接。
+
+    参数：
+    - controller_id: 控制器 ID
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（ID 无效、控制器正在被使用，或仍有任务管理器绑定该控制器）
+
+    说明：
+    需先调用 release_tasker() 释放绑定该控制器的任务管理器。
+    同一设备的控制器由所有调用方共用，仍有其他客户端使用时仅对当前客户端释放，并交还设备的操作权。
+    """,
+)
+@stats.timed_tool
+async def release_controller(controller_id: str) -> bool:
+    released = await run_blocking(object_registry.release, controller_id, "controller")
+    if released:
+        device_leases.release(controller_id, current_session.get())
+    return released
 
-    return object_registry.register(tasker)
+
+@mcp.tool(
+    name="release_resource",
+    description="""
+    释放资源，回收 OCR 模型等占用的内存。
+
+    参数：
+    - resource_id: 资源 ID，由 load_resource() 返回
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（ID 无效，或仍有任务管理器绑定该资源）
+
+    说明：
+    需先调用 release_tasker() 释放绑定该资源的任务管理器。
+    """,
+)
+@stats.timed_tool
+async def release_resource(resource_id: str) -> bool:
+    return await run_blocking(object_registry.release, resource_id, "resource")
+
+
+@mcp.tool(
+    name="list_sessions",
+    description="""
+    列出当前服务中所有已注册的对象（设备、窗口、控制器、资源、任务管理器）。
+
+    返回值：
+    - 对象列表，每项包含：
+      - id: 对象 ID
+      - kind: 对象类型（device / window / controller / resource / tasker）
+      - refs: 引用计数（正在使用或被任务管理器依赖的次数）
+      - depends_on: 依赖的对象 ID 列表
+      - idle_seconds: 空闲时长（秒）
+      - clients: 共用该对象的客户端数（设备与窗口为 null，所有客户端可见）
+
+    说明：
+    长时间空闲的控制器、资源与任务管理器会被自动释放，可用于确认 ID 是否仍然有效。
+    多个客户端共用服务时，仅列出当前客户端可见的对象。
+    """,
+)
+@stats.timed_tool
+async def list_sessions() -> list[dict]:
+    return object_registry.sessions()
 
 
 @mcp.tool(
@@ -269,195 +812,2131 @@ def create_tasker(controller_id: str, resource_id: str) -> Optional[str]:
 
     参数：
     - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - incremental: 是否启用增量识别（可选，默认 False）
+      启用后仅对与上一次 OCR 相比发生变化的屏幕区域重新识别，未变化区域沿用上次结果，
+      适合弹窗、数值刷新等局部变化的场景
+    - compact: 是否返回紧凑格式（可选，默认 False，推荐 True）
+      每项仅包含 text、box（[x, y, w, h] 整数）、score（保留两位小数），
+      并去除重复文本框、按位置排序；为 False 时保持识别结果的原有顺序
+    - min_score: 最低置信度（可选，默认 0），低于该值的结果将被过滤
+    - text_pattern: 文本正则表达式（可选），仅返回文本匹配的结果
+    - roi: 感兴趣区域 [x, y, w, h]（可选），仅对该区域执行识别，只关心部分界面时可大幅降低耗时
+    - max_side: 识别前将截图长边缩放至不超过该值（可选，默认 0 表示不缩放），
+      适合文字较大的界面；返回的坐标已换算回设备坐标，可直接用于 click()
 
     返回值：
     - 成功：返回识别结果字符串，包含识别到的文字、坐标信息、置信度等结构化数据
-    - 失败：返回 None（截图失败或 OCR 识别失败）
+    - 失败：返回 None（截图失败、OCR 识别失败或正则表达式无效）
 
     说明：
     识别结果可用于后续的坐标定位和自动化决策，通常包含文本内容、边界框坐标、置信度评分等信息。
+    仅需定位某段文字时，优先使用 find_text()。
 """,
 )
-def ocr(tasker_id: str) -> Optional[list]:
-    tasker: Tasker | None = object_registry.get(tasker_id)
-    if not tasker:
+@stats.timed_tool
+async def ocr(
+    tasker_id: str,
+    incremental: bool = False,
+    compact: bool = False,
+    min_score: float = 0.0,
+    text_pattern: Optional[str] = None,
+    roi: Optional[list[int]] = None,
+    max_side: int = 0,
+) -> Optional[list]:
+    results = await run_blocking(_ocr, tasker_id, incremental, None, roi, max_side)
+    if results is None:
         return None
-
-    image = tasker.controller.post_screencap().wait().get()
-    info: TaskDetail | None = (
-        tasker.post_recognition(JRecognitionType.OCR, JOCR(), image).wait().get()
-    )
-    if not info:
+    try:
+        results = filter_results(results, min_score, text_pattern, roi, compact)
+    except re.error:
         return None
-    return info.nodes[0].recognition.all_results
+    return [compact_result(result) for result in results] if compact else results
 
 
 @mcp.tool(
-    name="screencap",
+    name="find_text",
     description="""
-    对当前设备屏幕进行截图。
+    对当前设备屏幕执行 OCR，并返回与指定文本最匹配的一处结果的中心点坐标，可直接用于 click()。
+
     参数：
-    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - text_pattern: 文本正则表达式，普通文字可直接传入
+    - min_score: 最低置信度（可选，默认 0）
+    - roi: 感兴趣区域 [x, y, w, h]（可选），仅在该区域内查找
+
     返回值：
-    - 成功：返回截图文件的绝对路径，可通过 read_file 工具读取图片内容
-    - 失败：返回 None
+    - 成功：返回字典 {"text", "x", "y", "box", "score"}，其中 x、y 为文本框中心点
+    - 失败：返回 None（未找到匹配文本、识别失败或正则表达式无效）
     """,
 )
-def screencap(controller_id: str) -> Optional[str]:
-    controller = object_registry.get(controller_id)
-    if not controller:
+@stats.timed_tool
+async def find_text(
+    tasker_id: str,
+    text_pattern: str,
+    min_score: float = 0.0,
+    roi: Optional[list[int]] = None,
+) -> Optional[dict]:
+    results = await run_blocking(_ocr, tasker_id, False, None, roi)
+    if results is None:
         return None
-    image = controller.post_screencap().wait().get()
-    if image is None:
+    try:
+        return best_match(filter_results(results, min_score, text_pattern, roi))
+    except re.error:
         return None
-    # 保存截图到文件，返回路径供大模型按需读取，避免 Base64 占用大量 context
-    screenshots_dir = Path(__file__).parent / "screenshots"
-    screenshots_dir.mkdir(exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    filepath = screenshots_dir / f"screenshot_{timestamp}.png"
-    success = cv2.imwrite(str(filepath), image)
-    if not success:
-        return None
-    _saved_screenshots.append(filepath)
-    return str(filepath.absolute())
+
+
+def _ocr(
+    tasker_id: str,
+    incremental: bool = False,
+    max_age: Optional[float] = None,
+    roi: Optional[list[int]] = None,
+    max_side: int = 0,
+) -> Optional[list]:
+    with object_registry.use(tasker_id, "tasker") as tasker:
+        if not tasker:
+            return None
+
+        controller_id = _tasker_controllers.get(tasker_id, tasker_id)
+        frame = _capture_frame(controller_id, tasker.controller, max_age)
+        if frame is None:
+            return None
+        # 截图分辨率、识别区域或缩放不同时，缓存的结果不可复用
+        scope = (frame.image.shape[:2], tuple(roi) if roi else None, max_side)
+        snapshot = _ocr_snapshots.get(tasker_id)
+        if snapshot and snapshot[2] != scope:
+            snapshot = None
+        if snapshot and not frame_cache.changed(snapshot[0], frame):
+            if not roi:
+                _observe_screen(controller_id, snapshot[0], snapshot[1])
+            return snapshot[1]
+
+        regions = None
+        if incremental and snapshot and not roi and not max_side:
+            regions = changed_regions(snapshot[0], frame, snapshot[1])
+
+        if regions is None:
+            results = _cached_ocr(tasker, frame, roi, max_side, tasker_id)
+        else:
+            from maa.pipeline import JOCR
+
+            params = [JOCR(roi=roi) for roi in regions]
+            fresh = _run_ocr(tasker, frame.image, params, tasker_id)
+            results = (
+                None if fresh is None else merge_results(snapshot[1], fresh, regions)
+            )
+        if results is None:
+            return None
+        _ocr_snapshots[tasker_id] = (frame, results, scope)
+        if not roi:
+            _observe_screen(controller_id, frame, results)
+        return results
+
+
+# 两次画面识别之间最多记录的操作数，超出时不学习这段操作
+_MAX_TRANSITION_ACTIONS = 8
+
+
+def _record_action(controller_id: str, action: dict) -> None:
+    with _nav_lock:
+        pending = _pending_actions.setdefault(controller_id, [])
+        pending.append(dict(action))
+        if len(pending) > _MAX_TRANSITION_ACTIONS:
+            # 起点画面已无法对应到这段操作
+            _pending_actions.pop(controller_id)
+            _screen_states.pop(controller_id, None)
+
+
+def _observe_screen(controller_id: str, frame: Frame, results: list) -> ScreenState:
+    """识别画面状态；此前执行过操作且画面状态发生变化时，将这些操作记录为导航图的边"""
+    with _nav_lock:
+        observed = _screen_states.get(controller_id)
+        if observed and observed[1] is frame:
+            state = nav_graph.resolve(observed[0])
+            if state is not None:
+                return state
+        height, width = frame.image.shape[:2]
+        state = nav_graph.observe(
+            (width, height), perceptual_hash(frame.image), screen_anchors(results)
+        )
+        actions = _pending_actions.pop(controller_id, None)
+        if observed and actions and observed[0] != state.state_id:
+            nav_graph.add_transition(observed[0], state.state_id, actions)
+        _screen_states[controller_id] = (state.state_id, frame)
+        return state
+
+
+def _cached_ocr(
+    tasker: Tasker,
+    frame: Frame,
+    roi: Optional[list[int]],
+    max_side: int,
+    tasker_id: str,
+) -> Optional[list]:
+    """
+    先按画面查询 OCR 结果缓存，未命中时再识别；缓存按资源包内容指纹区分 OCR 模型
+
+    多个任务管理器同时识别同一帧的同一区域时只识别一次。
+    """
+    image = frame.image
+    fingerprint = resource_cache.fingerprint_of(_tasker_resources.get(tasker_id, ""))
+    if fingerprint is None:
+        return _run_scoped_ocr(tasker, image, roi, max_side, tasker_id)
+    params = f"{fingerprint}:{max_side}"
+    # 识别进行期间帧对象不会被回收，可用 id 区分不同的帧
+    key = ("ocr", id(image), tuple(roi) if roi else None, params)
+    return device_queue.coalesce(
+        key,
+        lambda: ocr_cache.get_or_compute(
+            image,
+            roi,
+            params,
+            lambda: _run_scoped_ocr(tasker, image, roi, max_side, tasker_id),
+            frame.signature,
+        ),
+    )
+
+
+def _run_scoped_ocr(
+    tasker: Tasker,
+    image,
+    roi: Optional[list[int]],
+    max_side: int,
+    tasker_id: Optional[str] = None,
+) -> Optional[list]:
+    """仅识别 roi 区域，并按需缩小截图后识别，结果坐标换算回原始截图坐标"""
+    from maa.pipeline import JOCR
+
+    scaled = prepare_image(image, max_side)
+    factor = image.shape[1] / scaled.shape[1]
+    param = JOCR()
+    if roi:
+        param = JOCR(roi=tuple(round(value / factor) for value in roi))
+    results = _run_ocr(tasker, scaled, [param], tasker_id)
+    return None if results is None else scale_results(results, factor)
+
+
+# 轮询等待类工具的截图间隔：画面变化时重置为最小值，无变化时逐步放大
+_POLL_MIN_INTERVAL = 0.1
+_POLL_MAX_INTERVAL = 1.0
+# 与 wait 一致，受客户端超时限制，单次等待最长 60 秒
+_MAX_WAIT_SECONDS = 60.0
+
+
+async def _poll(func: Callable[..., Any], *args: Any) -> Any:
+    """以后台优先级执行轮询中的截图与识别，不阻塞其他调用的操作"""
+    with background():
+        return await run_blocking(func, *args)
+
+
+def _fresh_frame(tasker_id: str) -> Optional[Frame]:
+    """绕过缓存有效期，为任务管理器绑定的设备获取一帧最新截图"""
+    with object_registry.use(tasker_id, "tasker") as tasker:
+        if not tasker:
+            return None
+        controller_id = _tasker_controllers.get(tasker_id, tasker_id)
+        return _capture_frame(controller_id, tasker.controller, max_age=0)
 
 
 @mcp.tool(
-    name="click",
+    name="wait_for_text",
     description="""
-    在设备屏幕上执行单点点击操作。
+    在服务端轮询屏幕，直到出现匹配的文字或超时，替代 wait() + ocr() 的反复调用。
+    画面未变化时不会重复执行 OCR。
 
     参数：
-    - controller_id: 控制器 ID，由 connect_adb_device() 返回
-    - x: 目标点的 X 坐标（像素，整数）
-    - y: 目标点的 Y 坐标（像素，整数）
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - text_pattern: 文本正则表达式，普通文字可直接传入
+    - timeout: 最长等待时间（秒，默认 10，最大 60）
+    - min_score: 最低置信度（可选，默认 0）
+    - roi: 感兴趣区域 [x, y, w, h]（可选），仅在该区域内查找
 
     返回值：
-    - 成功：返回 True
-    - 失败：返回 False
-
-    说明：
-    坐标系统以屏幕左上角为原点 (0, 0)，X 轴向右，Y 轴向下。
-""",
+    - 成功：返回字典，包含：
+      - found: 是否找到匹配文字
+      - match: 匹配结果 {"text", "x", "y", "box", "score"}，未找到时为 None
+      - elapsed: 实际等待时间（秒）
+      - ocr: 最后一次 OCR 的紧凑格式结果
+    - 失败：返回 None（截图或识别失败，或正则表达式无效）
+    """,
 )
-def click(controller_id: str, x: int, y: int) -> bool:
-    controller = object_registry.get(controller_id)
-    if not controller:
-        return False
-    return controller.post_click(x, y).wait().succeeded
+@stats.timed_tool
+async def wait_for_text(
+    tasker_id: str,
+    text_pattern: str,
+    timeout: float = 10.0,
+    min_score: float = 0.0,
+    roi: Optional[list[int]] = None,
+) -> Optional[dict]:
+    start = time.monotonic()
+    deadline = start + min(timeout, _MAX_WAIT_SECONDS)
+    interval = _POLL_MIN_INTERVAL
+    previous = None
+    while True:
+        results = await _poll(_ocr, tasker_id, False, 0, roi)
+        if results is None:
+            return None
+        try:
+            matches = filter_results(results, min_score, text_pattern, roi)
+        except re.error:
+            return None
+        if matches or time.monotonic() >= deadline:
+            return {
+                "found": bool(matches),
+                "match": best_match(matches),
+                "elapsed": round(time.monotonic() - start, 2),
+                "ocr": [compact_result(result) for result in filter_results(results)],
+            }
+        # _ocr 在画面未变化时返回同一结果对象
+        if results is not previous:
+            interval = _POLL_MIN_INTERVAL
+        else:
+            interval = min(interval * 1.5, _POLL_MAX_INTERVAL)
+        previous = results
+        await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
 
 
 @mcp.tool(
-    name="swipe",
+    name="wait_for_change",
     description="""
-    在设备屏幕上执行手势滑动操作，模拟手指从起始点滑动到终点。
+    在服务端轮询屏幕，直到画面相对上一次 ocr() 时发生变化或超时，适合点击后等待界面响应。
 
     参数：
-    - controller_id: 控制器 ID，由 connect_adb_device() 返回
-    - start_x: 起始点的 X 坐标（像素，整数）
-    - start_y: 起始点的 Y 坐标（像素，整数）
-    - end_x: 终点的 X 坐标（像素，整数）
-    - end_y: 终点的 Y 坐标（像素，整数）
-    - duration: 滑动持续时间（毫秒，整数）
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - timeout: 最长等待时间（秒，默认 10，最大 60）
 
     返回值：
-    - 成功：返回 True
-    - 失败：返回 False
+    - 成功：返回字典，包含：
+      - changed: 画面是否发生变化
+      - elapsed: 实际等待时间（秒）
+      - ocr: 最后一帧的紧凑格式 OCR 结果
+    - 失败：返回 None（截图或识别失败）
 
     说明：
-    坐标系统以屏幕左上角为原点 (0, 0)。duration 参数控制滑动速度，数值越大滑动越慢。
-""",
+    若此前未对该任务管理器调用过 ocr()，以本次调用时的画面作为比较基准。
+    """,
 )
-def swipe(
-        controller_id: str,
-        start_x: int,
-        start_y: int,
-        end_x: int,
-        end_y: int,
-        duration: int,
-) -> bool:
-    controller = object_registry.get(controller_id)
-    if not controller:
-        return False
-    return (
-        controller.post_swipe(start_x, start_y, end_x, end_y, duration).wait().succeeded
-    )
+@stats.timed_tool
+async def wait_for_change(tasker_id: str, timeout: float = 10.0) -> Optional[dict]:
+    start = time.monotonic()
+    deadline = start + min(timeout, _MAX_WAIT_SECONDS)
+    snapshot = _ocr_snapshots.get(tasker_id)
+    baseline = snapshot[0] if snapshot else await run_blocking(_fresh_frame, tasker_id)
+    if baseline is None:
+        return None
+
+    interval = _POLL_MIN_INTERVAL
+    changed = False
+    while time.monotonic() < deadline:
+        await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        frame = await _poll(_fresh_frame, tasker_id)
+        if frame is None:
+            return None
+        if frame_cache.changed(baseline, frame):
+            changed = True
+            break
+        interval = min(interval * 1.5, _POLL_MAX_INTERVAL)
+
+    results = await run_blocking(_ocr, tasker_id)
+    if results is None:
+        return None
+    return {
+        "changed": changed,
+        "elapsed": round(time.monotonic() - start, 2),
+        "ocr": [compact_result(result) for result in filter_results(results)],
+    }
 
 
 @mcp.tool(
-    name="input_text",
+    name="wait_for_stable",
     description="""
-    在设备屏幕上执行输入文本操作。
+    在服务端轮询屏幕，直到画面连续保持不变达到指定时长或超时，适合等待加载、动画或滚动结束。
 
     参数：
-    - controller_id: 控制器 ID，由 connect_adb_device() 返回
-    - text: 要输入的文本（字符串）
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - stable_seconds: 画面需保持不变的时长（秒，默认 1）
+    - timeout: 最长等待时间（秒，默认 10，最大 60）
 
     返回值：
-    - 成功：返回 True
-    - 失败：返回 False
-
-    说明：
-    输入文本操作将模拟用户在设备屏幕上输入文本，支持中文、英文等常见字符。
+    - 成功：返回字典，包含：
+      - stable: 画面是否已稳定
+      - elapsed: 实际等待时间（秒）
+      - ocr: 最后一帧的紧凑格式 OCR 结果
+    - 失败：返回 None（截图或识别失败）
     """,
 )
-def input_text(controller_id: str, text: str) -> bool:
-    controller = object_registry.get(controller_id)
-    if not controller:
-        return False
-    return controller.post_input_text(text).wait().succeeded
+@stats.timed_tool
+async def wait_for_stable(
+    tasker_id: str, stable_seconds: float = 1.0, timeout: float = 10.0
+) -> Optional[dict]:
+    start = time.monotonic()
+    deadline = start + min(timeout, _MAX_WAIT_SECONDS)
+    previous = await run_blocking(_fresh_frame, tasker_id)
+    if previous is None:
+        return None
+
+    stable_since = previous.timestamp
+    stable = False
+    interval = _POLL_MIN_INTERVAL
+    while time.monotonic() < deadline:
+        await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        frame = await _poll(_fresh_frame, tasker_id)
+        if frame is None:
+            return None
+        if frame_cache.changed(previous, frame):
+            stable_since = frame.timestamp
+            interval = _POLL_MIN_INTERVAL
+        else:
+            interval = min(interval * 1.5, _POLL_MAX_INTERVAL, stable_seconds / 2)
+        previous = frame
+        if frame.timestamp - stable_since >= stable_seconds:
+            stable = True
+            break
+
+    results = await run_blocking(_ocr, tasker_id)
+    if results is None:
+        return None
+    return {
+        "stable": stable,
+        "elapsed": round(time.monotonic() - start, 2),
+        "ocr": [compact_result(result) for result in filter_results(results)],
+    }
+
+
+# 单个服务最多同时存在的画面订阅数
+_MAX_SUBSCRIPTIONS = 16
+_screen_subscriptions: dict[str, ScreenSubscription] = {}
+# 客户端多久（秒）未读取订阅后停止采样，已结束的订阅再经过同样时长后移除，为 0 时不回收
+_subscription_ttl = float(os.environ.get("MAA_MCP_SUBSCRIPTION_TTL", "300"))
+
+
+def _expire_subscriptions() -> None:
+    """移除结束后长时间未被读取的订阅；未结束的订阅由采样任务在空闲超时后自行结束"""
+    if _subscription_ttl <= 0:
+        return
+    for subscription_id, subscription in list(_screen_subscriptions.items()):
+        if subscription.ended and subscription.idle_seconds() > _subscription_ttl:
+            del _screen_subscriptions[subscription_id]
 
 
 @mcp.tool(
-    name="click_key",
+    name="subscribe_screen",
     description="""
-    在设备屏幕上执行按键点击操作。
+    订阅设备画面变化：服务端在后台以自适应帧率采样屏幕，区域发生变化时推送事件，替代反复调用 ocr() / screencap() 轮询。
+    适合等待弹窗出现、加载完成等场景。
 
     参数：
-    - controller_id: 控制器 ID，由 connect_adb_device() 返回
-    - key: 要点击的按键（虚拟按键码）
+    - controller_id: 控制器 ID
+    - roi: 监视区域 [x, y, w, h]（可选，默认整个屏幕）
+    - mode: 事件内容（可选，默认 "change"）
+      - "change": 仅报告画面开始变化（changed）与重新稳定（stable）
+      - "ocr": stable 事件附带该区域的紧凑格式 OCR 结果（需已为该控制器创建任务管理器）
 
     返回值：
-    - 成功：返回 True
-    - 失败：返回 False
+    - 成功：返回字典，包含：
+      - subscription_id: 订阅 ID，用于 wait_screen_event() 与 unsubscribe_screen()
+      - uri: 订阅资源 URI，读取该资源可获取最近一次事件
+    - 失败：返回 None（控制器无效、mode 无效、ocr 模式下没有绑定该控制器的任务管理器，或订阅数已达上限）
+
+    说明：
+    有事件时服务端会发送该资源的 notifications/resources/updated 通知（需客户端连接支持服务端推送）；
+    也可调用 wait_screen_event() 等待下一个事件，画面无变化期间不消耗 token。
+    采样以后台优先级执行，不会阻塞点击等操作。
+    订阅及其资源仅对创建它的客户端可见；超过 MAA_MCP_SUBSCRIPTION_TTL 秒（默认 300）未读取事件或资源时自动结束。
     """,
 )
-def click_key(controller_id: str, key: int) -> bool:
-    controller = object_registry.get(controller_id)
-    if not controller:
-        return False
-    return controller.post_click_key(key).wait().succeeded
+@stats.timed_tool
+async def subscribe_screen(
+    controller_id: str, roi: Optional[list[int]] = None, mode: str = "change"
+) -> Optional[dict]:
+    if mode not in ("change", "ocr"):
+        return None
+    if object_registry.get(controller_id, "controller") is None:
+        return None
+    _expire_subscriptions()
+    tasker_id = None
+    if mode == "ocr":
+        tasker_id = next(
+            (
+                tid
+                for tid, cid in list(_tasker_controllers.items())
+                if cid == controller_id and object_registry.get(tid, "tasker")
+            ),
+            None,
+        )
+        if tasker_id is None:
+            return None
+    active = [s for s in _screen_subscriptions.values() if not s.ended]
+    if len(active) >= _MAX_SUBSCRIPTIONS:
+        return None
+
+    sampler = None
+    if tasker_id is not None:
+        sampler = await run_blocking(_sampler_tasker, tasker_id)
+        if sampler is None:
+            return None
+    subscription = ScreenSubscription(
+        controller_id, roi, mode, tasker_id, current_session.get()
+    )
+    try:
+        session = get_context().session
+    except RuntimeError:
+        session = None
+    _screen_subscriptions[subscription.subscription_id] = subscription
+    subscription.task = asyncio.create_task(
+        _sample_screen(subscription, session, sampler)
+    )
+    return {"subscription_id": subscription.subscription_id, "uri": subscription.uri}
 
 
 @mcp.tool(
-    name="scroll",
+    name="wait_screen_event",
     description="""
-    在设备屏幕上执行鼠标滚轮操作。
+    等待画面订阅的下一个事件，已有未读事件时立即返回。
 
     参数：
-    - controller_id: 控制器 ID，由 connect_adb_device() 返回
-    - x: 滚动的 X 坐标（像素，整数）
-    - y: 滚动的 Y 坐标（像素，整数）
+    - subscription_id: 订阅 ID，由 subscribe_screen() 返回
+    - timeout: 没有未读事件时的最长等待时间（秒，默认 30，最大 60）
 
     返回值：
-    - 成功：返回 True
-    - 失败：返回 False
+    - 成功：返回字典，包含：
+      - events: 事件列表（超时时为空），每项包含 sequence、type（changed / stable / ended）、timestamp，
+        ocr 模式下 stable 事件另含 ocr（紧凑格式 OCR 结果）
+      - ended: 订阅是否已结束（控制器被释放、截图或识别失败，或超过 MAA_MCP_SUBSCRIPTION_TTL 秒未读取）
+    - 失败：返回 None（订阅 ID 无效）
+    """,
+)
+@stats.timed_tool
+async def wait_screen_event(
+    subscription_id: str, timeout: float = 30.0
+) -> Optional[dict]:
+    _expire_subscriptions()
+    subscription = _find_subscription(subscription_id)
+    if subscription is None:
+        return None
+    events = await subscription.next_events(min(max(timeout, 0.0), _MAX_WAIT_SECONDS))
+    if subscription.ended:
+        _screen_subscriptions.pop(subscription_id, None)
+    return {"events": events, "ended": subscription.ended}
+
+
+@mcp.tool(
+    name="unsubscribe_screen",
+    description="""
+    取消画面订阅，停止后台采样。
+
+    参数：
+    - subscription_id: 订阅 ID，由 subscribe_screen() 返回
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（订阅 ID 无效）
+    """,
+)
+@stats.timed_tool
+async def unsubscribe_screen(subscription_id: str) -> bool:
+    subscription = _find_subscription(subscription_id)
+    if subscription is None:
+        return False
+    subscription.stop()
+    _screen_subscriptions.pop(subscription_id, None)
+    return True
+
+
+@mcp.resource(
+    "screen://subscriptions/{subscription_id}",
+    description="画面订阅的状态与最近一次事件",
+    mime_type="application/json",
+)
+def screen_subscription(subscription_id: str) -> dict:
+    subscription = _find_subscription(subscription_id)
+    if subscription is None:
+        return {"subscription_id": subscription_id, "ended": True, "latest": None}
+    subscription.touch()
+    return subscription.describe()
+
+
+def _find_subscription(subscription_id: str) -> Optional[ScreenSubscription]:
+    """查找订阅，其他客户端的订阅视为不存在"""
+    subscription = _screen_subscriptions.get(subscription_id)
+    session_id = current_session.get()
+    if subscription is None or (
+        session_id is not None and subscription.session_id != session_id
+    ):
+        return None
+    return subscription
+
+
+def _sampler_tasker(tasker_id: str) -> Optional[Tasker]:
+    """
+    为 OCR 订阅创建私有任务管理器，绑定与 tasker_id 相同的资源和控制器
+
+    采样器不占用客户端任务管理器的对象锁，也不改写其增量 OCR 快照。
+    """
+    resource = object_registry.get(_tasker_resources.get(tasker_id, ""), "resource")
+    controller = object_registry.get(
+        _tasker_controllers.get(tasker_id, ""), "controller"
+    )
+    if not resource or not controller:
+        return None
+    return _new_tasker(resource, controller)
+
+
+def _sample_ocr(
+    sampler: Tasker, tasker_id: str, frame: Frame, roi: Optional[list[int]]
+) -> Optional[list]:
+    # 识别采样到的稳定帧，按 tasker_id 所用资源共用 OCR 结果缓存
+    return _cached_ocr(sampler, frame, roi, 0, tasker_id)
+
+
+async def _sample_screen(
+    subscription: ScreenSubscription, session: Any, sampler: Optional[Tasker] = None
+) -> None:
+    """
+    后台采样订阅区域：变化时发布 changed，之后连续两帧相同时发布 stable
+
+    画面变化时以最小间隔采样，持续不变时逐步放大间隔，减少截图带宽占用。
+    OCR 订阅使用私有任务管理器 sampler 识别。
+    """
+    interval = MIN_INTERVAL
+    previous = None
+    settling = False
+    try:
+        while True:
+            if subscription.session_id and not session_tracker.active(
+                subscription.session_id
+            ):
+                # 客户端会话已结束，没有人会再读取事件
+                _screen_subscriptions.pop(subscription.subscription_id, None)
+                return
+            if 0 < _subscription_ttl < subscription.idle_seconds():
+                # 客户端长时间未读取事件，停止采样
+                break
+            frame = await _poll(_capture, subscription.controller_id, 0)
+            if frame is None:
+                break
+            if previous is not None and frame_cache.changed(
+                previous, frame, subscription.roi
+            ):
+                if not settling:
+                    await _publish_screen_event(subscription, session, "changed")
+                settling = True
+                interval = MIN_INTERVAL
+            elif settling:
+                fields = {}
+                if subscription.mode == "ocr":
+                    results = await _poll(
+                        _sample_ocr,
+                        sampler,
+                        subscription.tasker_id,
+                        frame,
+                        subscription.roi,
+                    )
+                    if results is None:
+                        break
+                    fields["ocr"] = [
+                        compact_result(result)
+                        for result in filter_results(results, roi=subscription.roi)
+                    ]
+                await _publish_screen_event(subscription, session, "stable", **fields)
+                settling = False
+            else:
+                interval = min(interval * 1.5, MAX_INTERVAL)
+            previous = frame
+            await asyncio.sleep(interval)
+        # 控制器已释放、截图失败或长时间无人读取，订阅在客户端读取 ended 事件后移除
+        await _publish_screen_event(subscription, session, "ended")
+    finally:
+        # 采样出错或被取消时同样结束订阅，等待中的 wait_screen_event 随即返回
+        if not subscription.ended:
+            subscription.publish("ended")
+
+
+async def _publish_screen_event(
+    subscription: ScreenSubscription, session: Any, event_type: str, **fields: Any
+) -> None:
+    subscription.publish(event_type, **fields)
+    if session is None:
+        return
+    try:
+        await session.send_resource_updated(subscription.uri)
+    except Exception:
+        # 客户端已断开或连接不支持服务端推送，事件仍可通过 wait_screen_event 取回
+        pass
+
+
+def _run_ocr(
+    tasker: Tasker, image, params: list[JOCR], tasker_id: Optional[str] = None
+) -> Optional[list]:
+    """依次提交多个 OCR 识别任务并汇总结果，任一任务失败时返回 None"""
+    from maa.pipeline import JRecognitionType
+
+    with stats.span("recognition", tasker_id):
+        jobs = [
+            tasker.post_recognition(JRecognitionType.OCR, param, image)
+            for param in params
+        ]
+        results = []
+        for job in jobs:
+            info: TaskDetail | None = job.wait().get()
+            if not info:
+                return None
+            results.extend(info.nodes[0].recognition.all_results)
+    return results
+
+
+# find_image 支持的匹配方式
+_MATCH_METHODS = ("TemplateMatch", "FeatureMatch")
+
+
+@mcp.tool(
+    name="list_templates",
+    description="""
+    列出资源包 image 目录下可供 find_image() 使用的模板图片。
+
+    参数：
+    - resource_id: 资源 ID，由 load_resource() 返回
+
+    返回值：
+    - 成功：返回模板列表，每项包含 name（模板名，即相对 image 目录的路径）、width、height
+    - 失败：返回 None（资源 ID 无效）
+    """,
+)
+@stats.timed_tool
+async def list_templates(resource_id: str) -> Optional[list[dict]]:
+    templates = template_index.list(resource_id)
+    if templates is None:
+        return None
+    return [
+        {"name": template.name, "width": template.width, "height": template.height}
+        for template in templates
+    ]
+
+
+@mcp.tool(
+    name="find_image",
+    description="""
+    对当前设备屏幕截图一次，并在该帧上匹配一个或多个模板图片，返回每个模板的最佳匹配位置。
+    适合定位没有文字的图标、按钮，避免 screencap() + 视觉识别的高开销。
+
+    参数：
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - templates: 模板名列表，为资源包 image 目录下的相对路径（如 ["buttons/ok.png"]），
+      可通过 list_templates() 查询
+    - method: 匹配方式（可选，默认 "TemplateMatch"）
+      - "TemplateMatch": 模板匹配，速度快，要求图标与模板尺寸一致
+      - "FeatureMatch": 特征点匹配，可容忍缩放与旋转，速度较慢
+    - threshold: TemplateMatch 的最低匹配度（可选，默认 0.7）
+    - roi: 感兴趣区域 [x, y, w, h]（可选），仅在该区域内匹配
+
+    返回值：
+    - 成功：返回字典，键为模板名，值为最佳匹配结果或 None（未匹配到）。
+      匹配结果包含 x、y（中心点，可直接用于 click()）、box（[x, y, w, h]），
+      以及 score（TemplateMatch 匹配度）或 count（FeatureMatch 匹配的特征点数）
+    - 失败：返回 None（截图或识别失败、模板不存在或匹配方式无效）
+    """,
+)
+@stats.timed_tool
+async def find_image(
+    tasker_id: str,
+    templates: list[str],
+    method: str = "TemplateMatch",
+    threshold: float = 0.7,
+    roi: Optional[list[int]] = None,
+) -> Optional[dict[str, Optional[dict]]]:
+    if method not in _MATCH_METHODS or not templates:
+        return None
+    return await run_blocking(
+        _find_image, tasker_id, templates, method, threshold, roi
+    )
+
+
+def _find_image(
+    tasker_id: str,
+    templates: list[str],
+    method: str,
+    threshold: float,
+    roi: Optional[list[int]],
+) -> Optional[dict[str, Optional[dict]]]:
+    from maa.pipeline import JFeatureMatch, JRecognitionType, JTemplateMatch
+
+    resource_id = _tasker_resources.get(tasker_id)
+    if resource_id is None or any(
+        template_index.get(resource_id, name) is None for name in templates
+    ):
+        return None
+    target = tuple(roi) if roi else (0, 0, 0, 0)
+    with object_registry.use(tasker_id, "tasker") as tasker:
+        if not tasker:
+            return None
+        controller_id = _tasker_controllers.get(tasker_id, tasker_id)
+        frame = _capture_frame(controller_id, tasker.controller)
+        if frame is None:
+            return None
+
+        # 所有模板共用同一帧，先全部提交再统一等待，减少逐个往返的开销
+        with stats.span("recognition", tasker_id):
+            if method == "TemplateMatch":
+                jobs = [
+                    tasker.post_recognition(
+                        JRecognitionType.TemplateMatch,
+                        JTemplateMatch(
+                            template=[name], roi=target, threshold=[threshold]
+                        ),
+                        frame.image,
+                    )
+                    for name in templates
+                ]
+            else:
+                jobs = [
+                    tasker.post_recognition(
+                        JRecognitionType.FeatureMatch,
+                        JFeatureMatch(template=[name], roi=target),
+                        frame.image,
+                    )
+                    for name in templates
+                ]
+            matches: dict[str, Optional[dict]] = {}
+            for name, job in zip(templates, jobs):
+                info: TaskDetail | None = job.wait().get()
+                if not info:
+                    return None
+                recognition = info.nodes[0].recognition if info.nodes else None
+                best = recognition.best_result if recognition else None
+                matches[name] = None if best is None else _image_match(best)
+    return matches
+
+
+def _image_match(result: Any) -> dict[str, Any]:
+    x, y, w, h = (int(value) for value in result.box)
+    match: dict[str, Any] = {"x": x + w // 2, "y": y + h // 2, "box": [x, y, w, h]}
+    if hasattr(result, "score"):
+        match["score"] = round(float(result.score), 2)
+    else:
+        match["count"] = int(result.count)
+    return match
+
+
+@mcp.tool(
+    name="set_capture_resolution",
+    description="""
+    设置控制器的截图分辨率。MaaFramework 默认将截图短边缩放至 720 像素，
+    OCR、find_image 与截图均基于该分辨率，click() 等操作的坐标也使用同一坐标系。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 或 connect_window() 返回
+    - short_side: 截图短边像素数（可选），如 720
+    - long_side: 截图长边像素数（可选），仅在未指定 short_side 时生效
+      两者均为 0 时使用设备原始分辨率
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（控制器无效，或设备正被其他客户端操作）
+
+    说明：
+    分辨率越低识别越快，但小号文字可能无法识别。修改后此前获取的坐标不再有效，需重新识别。
+    同一设备的控制器由所有调用方共用，修改对使用该设备的所有会话生效，因此与点击等操作一样受设备租约限制。
+    """,
+)
+@stats.timed_tool
+async def set_capture_resolution(
+    controller_id: str, short_side: int = 0, long_side: int = 0
+) -> bool:
+    return await run_blocking(
+        _set_capture_resolution, controller_id, short_side, long_side
+    )
+
+
+def _set_capture_resolution(
+    controller_id: str, short_side: int, long_side: int
+) -> bool:
+    # 修改会影响共用该设备的所有会话，与操作一样需要持有设备租约
+    if not _acquire_device(controller_id):
+        return False
+    with object_registry.use(controller_id, "controller") as controller:
+        if not controller:
+            return False
+        with device_queue.slot(controller_id):
+            if short_side > 0 or long_side > 0:
+                succeeded = controller.set_screenshot_use_raw_size(False) and (
+                    controller.set_screenshot_target_short_side(short_side)
+                    if short_side > 0
+                    else controller.set_screenshot_target_long_side(long_side)
+                )
+            else:
+                succeeded = controller.set_screenshot_use_raw_size(True)
+            frame_cache.invalidate(controller_id)
+    return succeeded
+
+
+@mcp.tool(
+    name="screencap",
+    description="""
+    对当前设备屏幕进行截图。
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - image_format: 图片格式（可选，png / jpg / webp，默认 png）
+    - quality: jpg / webp 的压缩质量（可选，1-100，默认 90）
+    - max_side: 图片长边的最大像素数（可选，默认 0 表示不缩放），推荐 1280 以降低读取开销
+    - roi: 裁剪区域 [x, y, w, h]（可选），仅保存该区域
+    返回值：
+    - 成功：返回截图文件的绝对路径，可通过 read_file 工具读取图片内容
+    - 失败：返回 None
+    说明：
+    使用 max_side 或 roi 时，图片中的像素坐标与设备坐标不再一致，点击坐标请通过 ocr() 或 find_text() 获取。
+    截图文件仅保留最近的若干张，旧文件会被自动删除，请在获取路径后尽快读取。
+    """,
+)
+@stats.timed_tool
+async def screencap(
+    controller_id: str,
+    image_format: str = "png",
+    quality: int = 90,
+    max_side: int = 0,
+    roi: Optional[list[int]] = None,
+) -> Optional[str]:
+    return await _screencap(controller_id, image_format, quality, max_side, roi)
+
+
+async def _screencap(
+    controller_id: str,
+    image_format: str = "png",
+    quality: int = 90,
+    max_side: int = 0,
+    roi: Optional[list[int]] = None,
+) -> Optional[str]:
+    frame = await run_blocking(_capture, controller_id)
+    return await _save_frame(frame, image_format, quality, max_side, roi)
+
+
+async def _save_frame(
+    frame: Optional[Frame],
+    image_format: str = "png",
+    quality: int = 90,
+    max_side: int = 0,
+    roi: Optional[list[int]] = None,
+) -> Optional[str]:
+    if frame is None:
+        return None
+    # 保存截图到文件，返回路径供大模型按需读取，避免 Base64 占用大量 context
+    filepath = await screenshot_store.save(
+        frame.image, image_format, quality, max_side, roi
+    )
+    if filepath is None:
+        return None
+    return str(filepath.absolute())
+
+
+def _capture(controller_id: str, max_age: Optional[float] = None) -> Optional[Frame]:
+    with object_registry.use(controller_id, "controller") as controller:
+        if not controller:
+            return None
+        return _capture_frame(controller_id, controller, max_age)
+
+
+def _capture_frame(
+    controller_id: str, controller: Controller, max_age: Optional[float] = None
+) -> Optional[Frame]:
+    """在设备队列中截图，同一设备同时发起的截图请求共用一次截图"""
+    frame = frame_cache.get(controller_id, max_age)
+    if frame is not None:
+        return frame
+    if controller_id in _running_tasks:
+        # 任务执行期间不插入截图，使用任务最近一次截取的画面
+        return _task_frame(controller_id, controller)
+
+    def capture() -> Optional[Frame]:
+        with device_queue.slot(controller_id):
+            return frame_cache.capture(controller_id, controller, max_age)
+
+    return device_queue.coalesce(("capture", controller_id), capture)
+
+
+def _task_frame(controller_id: str, controller: Controller) -> Optional[Frame]:
+    try:
+        image = controller.cached_image
+    except RuntimeError:
+        return None
+    if image is None or image.size == 0:
+        return None
+    return frame_cache.put(controller_id, image)
+
+
+async def _controller_action(controller_id: str, action: dict) -> bool:
+    return await run_blocking(_controller_action_sync, controller_id, action)
+
+
+def _acquire_device(controller_id: str) -> bool:
+    """
+    为当前客户端获取或续期设备租约
+
+    设备正被其他客户端操作，或正在执行 run_task() 提交的任务时返回 False。
+    """
+    if controller_id in _running_tasks:
+        return False
+    return device_leases.acquire(controller_id, current_session.get())
+
+
+def _controller_action_sync(controller_id: str, action: dict) -> bool:
+    """独占控制器提交一个操作（格式同 run_actions）并等待完成，操作后使该控制器的缓存帧失效"""
+    post = _ACTION_POSTERS[action["type"]]
+    if not _acquire_device(controller_id):
+        return False
+    with object_registry.use(controller_id, "controller") as controller:
+        if not controller:
+            return False
+        with device_queue.slot(controller_id):
+            with stats.span("action", controller_id):
+                succeeded = post(controller, action).wait().succeeded
+            if not succeeded and controller_pool.recover(controller_id):
+                # 连接已恢复，重试一次
+                with stats.span("action", controller_id):
+                    succeeded = post(controller, action).wait().succeeded
+            # 在队列中使缓存帧失效，排在操作之后的截图不会拿到操作前的画面
+            frame_cache.invalidate(controller_id)
+    if succeeded:
+        _record_action(controller_id, action)
+    return succeeded
+
+
+@mcp.tool(
+    name="click",
+    description="""
+    在设备屏幕上执行单点点击操作。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - x: 目标点的 X 坐标（像素，整数）
+    - y: 目标点的 Y 坐标（像素，整数）
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False
+
+    说明：
+    坐标系统以屏幕左上角为原点 (0, 0)，X 轴向右，Y 轴向下。
+""",
+)
+@stats.timed_tool
+async def click(controller_id: str, x: int, y: int) -> bool:
+    return await _controller_action(controller_id, {"type": "click", "x": x, "y": y})
+
+
+@mcp.tool(
+    name="swipe",
+    description="""
+    在设备屏幕上执行手势滑动操作，模拟手指从起始点滑动到终点。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - start_x: 起始点的 X 坐标（像素，整数）
+    - start_y: 起始点的 Y 坐标（像素，整数）
+    - end_x: 终点的 X 坐标（像素，整数）
+    - end_y: 终点的 Y 坐标（像素，整数）
+    - duration: 滑动持续时间（毫秒，整数）
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False
+
+    说明：
+    坐标系统以屏幕左上角为原点 (0, 0)。duration 参数控制滑动速度，数值越大滑动越慢。
+""",
+)
+@stats.timed_tool
+async def swipe(
+        controller_id: str,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: int,
+) -> bool:
+    return await _controller_action(
+        controller_id,
+        {
+            "type": "swipe",
+            "start_x": start_x,
+            "start_y": start_y,
+            "end_x": end_x,
+            "end_y": end_y,
+            "duration": duration,
+        },
+    )
+
+
+@mcp.tool(
+    name="input_text",
+    description="""
+    在设备屏幕上执行输入文本操作。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - text: 要输入的文本（字符串）
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False
+
+    说明：
+    输入文本操作将模拟用户在设备屏幕上输入文本，支持中文、英文等常见字符。
+    """,
+)
+@stats.timed_tool
+async def input_text(controller_id: str, text: str) -> bool:
+    return await _controller_action(
+        controller_id, {"type": "input_text", "text": text}
+    )
+
+
+@mcp.tool(
+    name="click_key",
+    description="""
+    在设备屏幕上执行按键点击操作。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - key: 要点击的按键（虚拟按键码）
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False
+    """,
+)
+@stats.timed_tool
+async def click_key(controller_id: str, key: int) -> bool:
+    return await _controller_action(controller_id, {"type": "click_key", "key": key})
+
+
+@mcp.tool(
+    name="scroll",
+    description="""
+    在设备屏幕上执行鼠标滚轮操作。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 返回
+    - x: 滚动的 X 坐标（像素，整数）
+    - y: 滚动的 Y 坐标（像素，整数）
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False
 
     注意：该方法仅对 Windows 窗口控制有效，无法作用于 ADB。
     """,
 )
-def scroll(controller_id: str, x: int, y: int) -> bool:
-    controller = object_registry.get(controller_id)
-    if not controller:
+@stats.timed_tool
+async def scroll(controller_id: str, x: int, y: int) -> bool:
+    return await _controller_action(controller_id, {"type": "scroll", "x": x, "y": y})
+
+
+# 批量操作支持的动作类型及其对应的控制器调用
+_ACTION_POSTERS = {
+    "click": lambda controller, step: controller.post_click(step["x"], step["y"]),
+    "swipe": lambda controller, step: controller.post_swipe(
+        step["start_x"],
+        step["start_y"],
+        step["end_x"],
+        step["end_y"],
+        step["duration"],
+    ),
+    "input_text": lambda controller, step: controller.post_input_text(step["text"]),
+    "click_key": lambda controller, step: controller.post_click_key(step["key"]),
+    "scroll": lambda controller, step: controller.post_scroll(step["x"], step["y"]),
+}
+
+
+@mcp.tool(
+    name="run_actions",
+    description="""
+    在一次调用中按顺序执行多个点击、滑动、按键、输入文本等操作，适合已知步骤的固定导航流程。
+
+    参数：
+    - controller_id: 控制器 ID，由 connect_adb_device() 或 connect_window() 返回
+    - actions: 操作列表，每个操作为一个字典，按顺序执行：
+      - {"type": "click", "x": 100, "y": 200}
+      - {"type": "swipe", "start_x": 100, "start_y": 800, "end_x": 100, "end_y": 200, "duration": 300}
+      - {"type": "input_text", "text": "hello"}
+      - {"type": "click_key", "key": 4}
+      - {"type": "scroll", "x": 0, "y": -120}
+      每个操作可额外指定 "delay"（秒，浮点数，最大 60），表示该操作完成后等待的时间，
+      等待期间不占用设备，其他调用的操作可能在此期间执行
+    - tasker_id: 任务管理器 ID（可选），提供时在全部操作成功后执行一次 OCR 并返回结果
+
+    返回值：
+    - 成功执行（含部分失败）：返回字典，包含：
+      - success: 是否全部成功
+      - steps: 每个操作的执行状态（succeeded / failed / invalid / skipped）及耗时（毫秒）
+      - ocr: 仅在提供 tasker_id 且全部操作成功时返回，格式同 ocr()
+    - 失败：返回 None（控制器无效，或设备正被其他客户端操作）
+
+    说明：
+    遇到第一个失败或参数无效的操作即停止，后续操作标记为 skipped。
+    操作类型或 delay 无效时不执行任何操作，无效的操作标记为 invalid，其余标记为 skipped。
+    """,
+)
+@stats.timed_tool
+async def run_actions(
+    controller_id: str, actions: list[dict], tasker_id: Optional[str] = None
+) -> Optional[dict]:
+    if object_registry.get(controller_id, "controller") is None:
+        return None
+    delays = [_action_delay(step) for step in actions]
+    if any(delay is None for delay in delays):
+        return {
+            "success": False,
+            "steps": [
+                {
+                    "index": index,
+                    "type": _action_type(step),
+                    "status": "invalid" if delay is None else "skipped",
+                }
+                for index, (step, delay) in enumerate(zip(actions, delays))
+            ],
+        }
+
+    steps: list[dict] = []
+    start = 0
+    while start < len(actions):
+        # 连续执行到下一个需要等待的操作为止，等待在设备队列之外进行
+        end = next(
+            (i + 1 for i in range(start, len(actions)) if delays[i] > 0), len(actions)
+        )
+        batch = await run_blocking(
+            _run_actions, controller_id, actions[start:end], start
+        )
+        if batch is None:
+            if not steps:
+                return None
+            batch = _skipped_steps(actions[start:end], start)
+        steps.extend(batch)
+        if any(step["status"] != "succeeded" for step in batch):
+            steps.extend(_skipped_steps(actions[end:], end))
+            break
+        if delays[end - 1] > 0:
+            await asyncio.sleep(delays[end - 1])
+        start = end
+
+    success = all(step["status"] == "succeeded" for step in steps)
+    result = {"success": success, "steps": steps}
+    if success and tasker_id:
+        result["ocr"] = await run_blocking(_ocr, tasker_id)
+    return result
+
+
+# run_actions 中单个操作完成后的最长等待时间（秒），与 wait 一致
+_MAX_ACTION_DELAY = 60.0
+
+
+def _action_type(step: Any) -> Any:
+    return step.get("type") if isinstance(step, dict) else None
+
+
+def _action_delay(step: Any) -> Optional[float]:
+    """检查操作类型与 delay，返回操作完成后的等待时间（秒）；无效时返回 None"""
+    action_type = _action_type(step)
+    if not isinstance(action_type, str) or action_type not in _ACTION_POSTERS:
+        return None
+    try:
+        delay = float(step.get("delay", 0))
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(delay) or delay < 0:
+        return None
+    return min(delay, _MAX_ACTION_DELAY)
+
+
+def _skipped_steps(actions: list[dict], offset: int) -> list[dict]:
+    return [
+        {"index": offset + index, "type": _action_type(step), "status": "skipped"}
+        for index, step in enumerate(actions)
+    ]
+
+
+def _run_actions(
+    controller_id: str, actions: list[dict], offset: int = 0
+) -> Optional[list[dict]]:
+    """独占控制器按顺序执行一段已校验的操作，避免其他调用的操作插入到这段操作中间"""
+    if not _acquire_device(controller_id):
+        return None
+    with object_registry.use(controller_id, "controller") as controller:
+        if not controller:
+            return None
+
+        # 这段操作在设备队列中连续执行，其他调用的截图与操作排在其后
+        with device_queue.slot(controller_id):
+            steps = []
+            success = True
+            for index, step in enumerate(actions, offset):
+                action_type = step["type"]
+                if not success:
+                    steps.append(
+                        {"index": index, "type": action_type, "status": "skipped"}
+                    )
+                    continue
+
+                start = time.perf_counter()
+                poster = _ACTION_POSTERS.get(action_type)
+                try:
+                    job = poster(controller, step) if poster else None
+                except (KeyError, TypeError, ValueError):
+                    job = None
+                if job is None:
+                    status = "invalid"
+                else:
+                    with stats.span("action", controller_id):
+                        succeeded = job.wait().succeeded
+                    status = "succeeded" if succeeded else "failed"
+                frame_cache.invalidate(controller_id)
+                if status == "succeeded":
+                    _record_action(controller_id, step)
+                steps.append(
+                    {
+                        "index": index,
+                        "type": action_type,
+                        "status": status,
+                        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                    }
+                )
+                if status != "succeeded":
+                    success = False
+    return steps
+
+
+# scroll_find_text 单次调用的最大滚动次数
+_MAX_SCROLLS = 50
+# 滚动后等待画面静止（惯性滚动结束）的最长时间（秒）
+_SCROLL_SETTLE_SECONDS = 3.0
+
+
+@mcp.tool(
+    name="scroll_find_text",
+    description="""
+    在服务端重复滚动列表并查找文字，直到找到目标文字或到达列表末尾，替代 swipe() + ocr() 的反复调用。
+    每次滚动后根据前后两帧的重叠部分估计滚动距离，只识别新露出的区域。
+
+    参数：
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - text_pattern: 文本正则表达式，普通文字可直接传入
+    - action: 每次执行的滚动操作，格式同 run_actions() 中的操作，仅支持 swipe 与 scroll：
+      - {"type": "swipe", "start_x": 360, "start_y": 1000, "end_x": 360, "end_y": 400, "duration": 300}
+      - {"type": "scroll", "x": 0, "y": -120}
+    - max_scrolls: 最多滚动次数（默认 20，最大 50）
+    - min_score: 最低置信度（可选，默认 0）
+    - roi: 列表区域 [x, y, w, h]（可选），仅在该区域内比较画面与查找文字
+
+    返回值：
+    - 成功：返回字典，包含：
+      - found: 是否找到匹配文字
+      - match: 匹配结果 {"text", "x", "y", "box", "score"}，坐标为当前画面中的位置，未找到时为 None
+      - scrolls: 实际滚动次数
+      - reached_end: 是否因画面不再变化而停止（已到达列表末尾）
+      - elapsed: 总耗时（秒）
+    - 失败：返回 None（任务管理器无效、操作参数无效、滚动操作失败，或截图、识别失败）
+    """,
+)
+@stats.timed_tool
+async def scroll_find_text(
+    tasker_id: str,
+    text_pattern: str,
+    action: dict,
+    max_scrolls: int = 20,
+    min_score: float = 0.0,
+    roi: Optional[list[int]] = None,
+) -> Optional[dict]:
+    start = time.monotonic()
+    controller_id = _tasker_controllers.get(tasker_id)
+    axis = _scroll_axis(action)
+    if controller_id is None or axis is None:
+        return None
+    try:
+        re.compile(text_pattern)
+    except re.error:
+        return None
+
+    def result(found: list, scrolls: int, reached_end: bool) -> dict:
+        return {
+            "found": bool(found),
+            "match": best_match(found),
+            "scrolls": scrolls,
+            "reached_end": reached_end,
+            "elapsed": round(time.monotonic() - start, 2),
+        }
+
+    results = await run_blocking(_ocr, tasker_id, False, 0, roi)
+    snapshot = _ocr_snapshots.get(tasker_id)
+    if results is None or snapshot is None:
+        return None
+    matches = filter_results(results, min_score, text_pattern, roi)
+    if matches:
+        return result(matches, 0, False)
+
+    previous = snapshot[0]
+    for scrolls in range(1, min(max_scrolls, _MAX_SCROLLS) + 1):
+        if not await _controller_action(controller_id, action):
+            return None
+        frame = await _settled_frame(tasker_id)
+        if frame is None:
+            return None
+        if not frame_cache.changed(previous, frame):
+            return result([], scrolls, True)
+        results = await run_blocking(
+            _ocr_revealed, tasker_id, previous, frame, axis, roi
+        )
+        if results is None:
+            return None
+        matches = filter_results(results, min_score, text_pattern, roi)
+        if matches:
+            return result(matches, scrolls, False)
+        previous = frame
+    return result([], min(max_scrolls, _MAX_SCROLLS), False)
+
+
+def _scroll_axis(action: dict) -> Optional[int]:
+    """根据滚动操作判断列表方向：0 为纵向，1 为横向；操作无效时返回 None"""
+    try:
+        if action.get("type") == "swipe":
+            dx = int(action["end_x"]) - int(action["start_x"])
+            dy = int(action["end_y"]) - int(action["start_y"])
+            int(action["duration"])
+        elif action.get("type") == "scroll":
+            dx, dy = int(action["x"]), int(action["y"])
+        else:
+            return None
+    except (KeyError, TypeError, ValueError):
+        return None
+    return 0 if abs(dy) >= abs(dx) else 1
+
+
+async def _settled_frame(tasker_id: str) -> Optional[Frame]:
+    """等待惯性滚动结束：连续两帧相同或超时后返回最后一帧"""
+    deadline = time.monotonic() + _SCROLL_SETTLE_SECONDS
+    previous = await run_blocking(_fresh_frame, tasker_id)
+    while previous is not None and time.monotonic() < deadline:
+        await asyncio.sleep(_POLL_MIN_INTERVAL)
+        frame = await run_blocking(_fresh_frame, tasker_id)
+        if frame is None or not frame_cache.changed(previous, frame):
+            return frame
+        previous = frame
+    return previous
+
+
+def _ocr_revealed(
+    tasker_id: str,
+    previous: Frame,
+    frame: Frame,
+    axis: int,
+    roi: Optional[list[int]],
+) -> Optional[list]:
+    """只识别滚动后新露出的区域，无法估计滚动距离时识别整个列表区域"""
+    with object_registry.use(tasker_id, "tasker") as tasker:
+        if not tasker:
+            return None
+        region = tuple(roi) if roi else None
+        offset = scroll_offset(previous.image, frame.image, axis, region)
+        if offset:
+            region = revealed_region(frame.image.shape, region, offset, axis)
+        target = list(region) if region else None
+        return _cached_ocr(tasker, frame, target, 0, tasker_id)
+
+
+def _describe_state(state: ScreenState) -> dict[str, Any]:
+    return {
+        "state_id": state.state_id,
+        "name": state.name,
+        "anchors": state.anchors,
+        "seen": state.seen,
+        "transitions": [
+            {
+                "target": transition.target,
+                "actions": len(transition.actions),
+                "successes": transition.successes,
+                "failures": transition.failures,
+            }
+            for transition in nav_graph.transitions_from(state.state_id)
+        ],
+    }
+
+
+def _current_screen_state(tasker_id: str) -> Optional[ScreenState]:
+    """截取最新画面并识别其画面状态"""
+    controller_id = _tasker_controllers.get(tasker_id)
+    results = _ocr(tasker_id, False, 0)
+    snapshot = _ocr_snapshots.get(tasker_id)
+    if controller_id is None or results is None or snapshot is None:
+        return None
+    return _observe_screen(controller_id, snapshot[0], results)
+
+
+@mcp.tool(
+    name="get_screen_state",
+    description="""
+    识别当前画面对应的画面状态。服务端会根据每次全屏 ocr() 的结果自动学习画面状态，
+    并把两次识别之间执行的点击、滑动等操作记录为画面之间的切换路径，供 navigate_to() 使用。
+
+    参数：
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+
+    返回值：
+    - 成功：返回字典，包含：
+      - state_id: 画面状态 ID
+      - name: 画面名称（由 name_screen_state() 设置），未命名时为 None
+      - anchors: 用于识别该画面的锚点文字
+      - seen: 该画面被识别到的次数
+      - transitions: 已知的从该画面出发的切换路径（目标画面、操作数、成功与失败次数）
+    - 失败：返回 None（截图或识别失败）
+    """,
+)
+@stats.timed_tool
+async def get_screen_state(tasker_id: str) -> Optional[dict]:
+    state = await run_blocking(_current_screen_state, tasker_id)
+    if state is None:
+        return None
+    return _describe_state(state)
+
+
+@mcp.tool(
+    name="list_screen_states",
+    description="""
+    列出导航图中所有已学习的画面状态及其切换路径。
+
+    返回值：
+    - 画面状态列表，每项格式同 get_screen_state()
+    """,
+)
+@stats.timed_tool
+async def list_screen_states() -> list[dict]:
+    return [_describe_state(state) for state in nav_graph.states()]
+
+
+@mcp.tool(
+    name="name_screen_state",
+    description="""
+    为画面状态命名（如 "home"、"settings"），之后可用名称调用 navigate_to()。名称唯一，
+    已被其他画面使用的名称会转移到该画面。
+
+    参数：
+    - state_id: 画面状态 ID，由 get_screen_state() 或 list_screen_states() 返回
+    - name: 画面名称
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（画面状态不存在）
+    """,
+)
+@stats.timed_tool
+async def name_screen_state(state_id: str, name: str) -> bool:
+    return nav_graph.rename(state_id, name)
+
+
+@mcp.tool(
+    name="navigate_to",
+    description="""
+    按导航图中已学习的最短路径导航到目标画面，每一步执行后都会识别画面确认是否到达预期画面，
+    偏离预期时从实际所在画面重新规划路径。替代大模型逐步 ocr() + 决策 + 点击的导航流程。
+
+    参数：
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - state: 目标画面的名称或状态 ID
+    - max_hops: 最多执行的切换次数（默认 10）
+
+    返回值：
+    - 成功：返回字典，包含：
+      - reached: 是否到达目标画面
+      - state_id: 当前所在画面的状态 ID
+      - name: 当前所在画面的名称
+      - hops: 实际执行的切换次数
+      - path: 依次经过的画面状态 ID
+      - reason: 未到达时的原因，到达时为 None：
+        - no_path: 没有已知路径（或已知路径在本次导航中均未到达预期画面）
+        - action_failed: 操作执行失败
+        - max_hops: 超过最大切换次数
+      - elapsed: 总耗时（秒）
+    - 失败：返回 None（目标画面不存在、任务管理器无效，或截图、识别失败）
+    """,
+)
+@stats.timed_tool
+async def navigate_to(tasker_id: str, state: str, max_hops: int = 10) -> Optional[dict]:
+    start = time.monotonic()
+    target = nav_graph.resolve(state)
+    controller_id = _tasker_controllers.get(tasker_id)
+    if target is None or controller_id is None:
+        return None
+    current = await run_blocking(_current_screen_state, tasker_id)
+    if current is None:
+        return None
+
+    path = [current.state_id]
+    # 本次导航中未到达预期画面的边不再使用
+    failed: list[Transition] = []
+    reason = None
+    while current.state_id != target.state_id:
+        if len(path) - 1 >= max_hops:
+            reason = "max_hops"
+            break
+        route = nav_graph.shortest_path(current.state_id, target.state_id, failed)
+        if not route:
+            reason = "no_path"
+            break
+        transition = route[0]
+        for action in transition.actions:
+            if not await _controller_action(controller_id, action):
+                reason = "action_failed"
+                break
+            await _settled_frame(tasker_id)
+        if reason:
+            break
+        current = await run_blocking(_current_screen_state, tasker_id)
+        if current is None:
+            return None
+        if current.state_id != transition.target:
+            nav_graph.mark_failed(transition)
+            failed.append(transition)
+        path.append(current.state_id)
+
+    return {
+        "reached": current.state_id == target.state_id,
+        "state_id": current.state_id,
+        "name": current.name,
+        "hops": len(path) - 1,
+        "path": path,
+        "reason": reason,
+        "elapsed": round(time.monotonic() - start, 2),
+    }
+
+
+async def _fan_out(
+    object_ids: list[str],
+    func: Callable[[str], Any],
+    timeout: float,
+    finish: Optional[Callable[[Any], Awaitable[Any]]] = None,
+) -> dict[str, dict]:
+    """
+    对多个对象并发执行同一阻塞操作，返回按 ID 索引的结果与耗时
+
+    每个对象在独立线程中执行，超时从提交时开始计算；finish 在事件循环中处理结果（如保存截图）。
+    上一次调用仍未结束的对象直接返回 busy，卡住的设备最多占用一个线程。
+    """
+
+    async def run_one(object_id: str) -> tuple[str, dict]:
+        start = time.perf_counter()
+        future = dispatch(object_id, func, object_id)
+        if future is None:
+            entry = {"result": None, "error": "busy"}
+        else:
+            try:
+                result = await asyncio.wait_for(future, timeout)
+                entry = {"result": await finish(result) if finish else result}
+            except asyncio.TimeoutError:
+                # 超时仅放弃等待，调用仍在其线程中执行，结束前该对象返回 busy
+                entry = {"result": None, "error": "timeout"}
+        entry["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return object_id, entry
+
+    unique_ids = dict.fromkeys(object_ids)
+    return dict(await asyncio.gather(*(run_one(object_id) for object_id in unique_ids)))
+
+
+@mcp.tool(
+    name="ocr_many",
+    description="""
+    对多个设备并发执行截图 + OCR 识别，适合同时管理多台设备时批量获取屏幕状态。
+
+    参数：
+    - tasker_ids: 任务管理器 ID 列表，由 create_tasker() 返回
+    - timeout: 单个设备的超时时间（秒，默认 10）
+
+    返回值：
+    - 以任务管理器 ID 为键的字典，每项包含：
+      - result: 与 ocr() 相同的识别结果，失败时为 None
+      - latency_ms: 该设备的耗时（毫秒）
+      - error: 超时时为 "timeout"；该设备上一次调用（如超时的调用）尚未结束时为 "busy"
+    """,
+)
+@stats.timed_tool
+async def ocr_many(tasker_ids: list[str], timeout: float = 10.0) -> dict[str, dict]:
+    return await _fan_out(tasker_ids, _ocr, timeout)
+
+
+@mcp.tool(
+    name="screencap_many",
+    description="""
+    对多个设备并发截图。
+
+    参数：
+    - controller_ids: 控制器 ID 列表
+    - timeout: 单个设备的超时时间（秒，默认 10）
+
+    返回值：
+    - 以控制器 ID 为键的字典，每项包含：
+      - result: 截图文件的绝对路径，失败时为 None
+      - latency_ms: 该设备的耗时（毫秒）
+      - error: 超时时为 "timeout"；该设备上一次调用（如超时的调用）尚未结束时为 "busy"
+    """,
+)
+@stats.timed_tool
+async def screencap_many(
+    controller_ids: list[str], timeout: float = 10.0
+) -> dict[str, dict]:
+    return await _fan_out(controller_ids, _capture, timeout, _save_frame)
+
+
+@mcp.tool(
+    name="click_many",
+    description="""
+    在多个设备的相同坐标上并发执行点击操作。
+
+    参数：
+    - controller_ids: 控制器 ID 列表
+    - x: 目标点的 X 坐标（像素，整数）
+    - y: 目标点的 Y 坐标（像素，整数）
+    - timeout: 单个设备的超时时间（秒，默认 10）
+
+    返回值：
+    - 以控制器 ID 为键的字典，每项包含：
+      - result: 成功为 True，失败为 False，超时或设备忙时为 None
+      - latency_ms: 该设备的耗时（毫秒）
+      - error: 超时时为 "timeout"；该设备上一次调用（如超时的调用）尚未结束时为 "busy"
+    """,
+)
+@stats.timed_tool
+async def click_many(
+    controller_ids: list[str], x: int, y: int, timeout: float = 10.0
+) -> dict[str, dict]:
+    return await _fan_out(
+        controller_ids,
+        lambda controller_id: _controller_action_sync(
+            controller_id, {"type": "click", "x": x, "y": y}
+        ),
+        timeout,
+    )
+
+
+@mcp.tool(
+    name="list_tasks",
+    description="""
+    列出资源包 interface.json 中定义的任务及其选项预设，供 run_task() 使用。
+
+    参数：
+    - resource_id: 资源 ID，由 load_resource() 返回
+
+    返回值：
+    - 成功：返回任务列表，每项包含 name（任务名）、entry（入口节点）、
+      options（选项名 -> {"cases": 可选值列表, "default": 默认值}）
+    - 失败：返回 None（资源 ID 无效，或资源包目录及其上一级目录中没有可解析的 interface.json）
+    """,
+)
+@stats.timed_tool
+async def list_tasks(resource_id: str) -> Optional[list[dict]]:
+    interface = _resource_interface(resource_id)
+    if interface is None:
+        return None
+    return describe_tasks(interface)
+
+
+def _resource_interface(resource_id: str) -> Optional[dict]:
+    bundle_path = resource_cache.path_of(resource_id)
+    if bundle_path is None:
+        return None
+    path = find_interface(bundle_path)
+    return load_interface(path) if path else None
+
+
+@dataclass
+class _TaskRun:
+    tasker_id: str
+    entry: str
+    job: TaskJob
+    started: float
+    stopped: bool = False
+
+
+# 保留的任务运行记录数，超出时丢弃最早的已结束记录
+_MAX_TASK_RUNS = 100
+_task_runs: dict[str, _TaskRun] = {}
+# 正在执行 pipeline 任务的控制器 -> 任务运行 ID（提交中为 None），任务结束前由任务独占设备
+_running_tasks: dict[str, Optional[str]] = {}
+_task_lock = threading.Lock()
+# 任务进度中返回的最近节点数
+_RECENT_NODES = 10
+
+
+@mcp.tool(
+    name="run_task",
+    description="""
+    使用 MaaFramework 的 pipeline 引擎执行资源包中的整段任务流程，适合确定性的多步操作，
+    比逐步调用 ocr() / click() 快得多。任务在后台执行，可通过 get_task_status() 查询进度。
+
+    参数：
+    - tasker_id: 任务管理器 ID，由 create_tasker() 返回
+    - entry: 任务名，可以是 interface.json 中任务的 name 或 entry，也可以是 pipeline 节点名
+    - pipeline_override: 覆盖 pipeline 节点参数的字典（可选），优先级高于 interface.json 预设
+    - options: interface.json 任务选项 {选项名: 选项值}（可选），未指定的选项使用默认值
+    - timeout: 提交后等待任务完成的最长时间（秒，默认 0 表示立即返回，最大 60）
+
+    返回值：
+    - 成功：返回任务状态字典，格式同 get_task_status()
+    - 失败：返回 None（任务管理器 ID 无效，或任务、选项不存在，或设备正被其他客户端操作，
+      或该设备上已有任务在执行）
+
+    说明：
+    任务执行期间独占设备直至结束：click() 等操作工具与该设备上的其他 run_task() 调用均返回失败，
+    ocr()、screencap() 等读取工具使用任务最近一次截取的画面。可调用 stop_task() 中止。
+    """,
+)
+@stats.timed_tool
+async def run_task(
+    tasker_id: str,
+    entry: str,
+    pipeline_override: Optional[dict] = None,
+    options: Optional[dict[str, str]] = None,
+    timeout: float = 0.0,
+) -> Optional[dict]:
+    resource_id = _tasker_resources.get(tasker_id)
+    if resource_id is None:
+        return None
+    interface = await run_blocking(_resource_interface, resource_id)
+    resolved = resolve_task(interface, entry, options)
+    if resolved is None:
+        return None
+    entry, override = resolved
+    override = merge_override(override, pipeline_override or {})
+    task_run_id = await run_blocking(_post_task, tasker_id, entry, override)
+    if task_run_id is None:
+        return None
+    return await _task_status(task_run_id, timeout)
+
+
+@mcp.tool(
+    name="get_task_status",
+    description="""
+    查询 run_task() 启动的任务的执行进度。
+
+    参数：
+    - task_run_id: 任务运行 ID，由 run_task() 返回
+    - timeout: 任务未结束时最多等待的时间（秒，默认 0 表示立即返回，最大 60），
+      可用于长轮询，任务结束后立即返回
+
+    返回值：
+    - 成功：返回字典，包含：
+      - task_run_id: 任务运行 ID
+      - entry: 入口节点名
+      - status: pending / running / succeeded / failed / stopped
+      - elapsed: 已运行时间（秒）
+      - node_count: 已执行的节点数
+      - recent_nodes: 最近执行的节点名列表
+    - 失败：返回 None（任务运行 ID 无效或已被清理）
+    """,
+)
+@stats.timed_tool
+async def get_task_status(task_run_id: str, timeout: float = 0.0) -> Optional[dict]:
+    return await _task_status(task_run_id, timeout)
+
+
+def _post_task(tasker_id: str, entry: str, override: dict) -> Optional[str]:
+    """提交任务并登记运行记录，返回任务运行 ID；设备被占用或已有任务在执行时返回 None"""
+    controller_id = _tasker_controllers.get(tasker_id)
+    if controller_id is None:
+        return None
+    with _task_lock:
+        # 先占位再提交，同时提交的任务不会都通过检查
+        if not _acquire_device(controller_id):
+            return None
+        _running_tasks[controller_id] = None
+    job = None
+    try:
+        with object_registry.use(tasker_id, "tasker") as tasker:
+            if tasker:
+                job = tasker.post_task(entry, override)
+    finally:
+        if job is None:
+            with _task_lock:
+                _running_tasks.pop(controller_id, None)
+    if job is None:
+        return None
+
+    task_run_id = str(uuid.uuid4())
+    with _task_lock:
+        _task_runs[task_run_id] = _TaskRun(tasker_id, entry, job, time.monotonic())
+        _running_tasks[controller_id] = task_run_id
+        finished = [key for key, run in _task_runs.items() if run.job.done]
+        for key in finished[: max(0, len(_task_runs) - _MAX_TASK_RUNS)]:
+            del _task_runs[key]
+    # 任务会操作设备，已缓存的截图不再可信
+    frame_cache.invalidate(controller_id)
+    threading.Thread(
+        target=_finish_task,
+        args=(controller_id, current_session.get(), job),
+        name="maa-mcp-task",
+        daemon=True,
+    ).start()
+    return task_run_id
+
+
+def _finish_task(controller_id: str, session_id: Optional[str], job: TaskJob) -> None:
+    """等待任务结束后交还设备：解除独占并释放提交任务的会话持有的租约"""
+    job.wait()
+    with _task_lock:
+        _running_tasks.pop(controller_id, None)
+    device_leases.release(controller_id, session_id)
+    frame_cache.invalidate(controller_id)
+
+
+async def _task_status(task_run_id: str, timeout: float) -> Optional[dict]:
+    run = _task_runs.get(task_run_id)
+    if run is None:
+        return None
+    deadline = time.monotonic() + min(max(timeout, 0.0), _MAX_WAIT_SECONDS)
+    interval = _POLL_MIN_INTERVAL
+    while not run.job.done and time.monotonic() < deadline:
+        await asyncio.sleep(min(interval, max(0.0, deadline - time.monotonic())))
+        interval = min(interval * 2, _POLL_MAX_INTERVAL)
+    return await run_blocking(_describe_task_run, task_run_id, run)
+
+
+def _describe_task_run(task_run_id: str, run: _TaskRun) -> dict:
+    status = run.job.status
+    if run.stopped:
+        state = "stopped"
+    elif status.succeeded:
+        state = "succeeded"
+    elif status.failed:
+        state = "failed"
+    else:
+        state = "running" if status.running else "pending"
+
+    node_ids: list[int] = []
+    recent_nodes: list[str] = []
+    tasker = object_registry.get(run.tasker_id, "tasker")
+    detail = run.job.get()
+    if detail and tasker:
+        node_ids = detail.node_id_list
+        for node_id in node_ids[-_RECENT_NODES:]:
+            node = tasker.get_node_detail(node_id)
+            if node:
+                recent_nodes.append(node.name)
+    return {
+        "task_run_id": task_run_id,
+        "entry": run.entry,
+        "status": state,
+        "elapsed": round(time.monotonic() - run.started, 2),
+        "node_count": len(node_ids),
+        "recent_nodes": recent_nodes,
+    }
+
+
+@mcp.tool(
+    name="stop_task",
+    description="""
+    中止 run_task() 启动的任务。
+
+    参数：
+    - task_run_id: 任务运行 ID，由 run_task() 返回
+
+    返回值：
+    - 成功：返回 True（任务已停止或已结束）
+    - 失败：返回 False（任务运行 ID 无效，或任务管理器已释放）
+
+    说明：
+    MaaFramework 按任务管理器停止任务，同一任务管理器上排队的其他任务也会一并停止。
+    """,
+)
+@stats.timed_tool
+async def stop_task(task_run_id: str) -> bool:
+    run = _task_runs.get(task_run_id)
+    if run is None:
         return False
-    return controller.post_scroll(x, y).wait().succeeded
+    if run.job.done:
+        return True
+    return await run_blocking(_stop_task, run)
+
+
+def _stop_task(run: _TaskRun) -> bool:
+    tasker = object_registry.get(run.tasker_id, "tasker")
+    if not tasker:
+        return False
+    run.stopped = True
+    succeeded = tasker.post_stop().wait().succeeded
+    frame_cache.invalidate(_tasker_controllers.get(run.tasker_id, run.tasker_id))
+    return succeeded
+
+
+@mcp.tool(
+    name="server_stats",
+    description="""
+    获取服务端性能统计，用于定位耗时来源（截图、OCR 识别、操作执行、图片编码或服务端本身）。
+
+    参数：
+    - reset: 是否在返回后清空统计（可选，默认 False）
+
+    返回值：
+    - 字典，包含：
+      - uptime_seconds: 统计时长（秒）
+      - tools: 各工具的调用次数、异常数、失败数及 p50 / p95 / p99 / max 耗时（毫秒）
+      - stages: 内部阶段耗时（capture 截图、recognition 识别、action 操作、encode 编码、registry 对象查找与排队、queue 设备队列等待）
+      - devices: 按设备（控制器 / 任务管理器 ID）划分的工具与阶段耗时
+      - ocr_cache: OCR 结果缓存的条目数与命中 / 未命中次数
+      - queues: 各设备队列的排队请求数（depth）、是否正在执行（busy）、已执行请求数（served），以及被合并的重复截图、识别请求数（coalesced）
+      - clients: 当前连接的客户端会话数
+      - startup: 启动耗时（毫秒），包括模块导入（import）、各预热步骤及预热完成时间（ready）
+    """,
+)
+async def server_stats(reset: bool = False) -> dict:
+    snapshot = stats.snapshot()
+    snapshot["startup"] = dict(warmup.timings)
+    snapshot["ocr_cache"] = ocr_cache.summary()
+    snapshot["queues"] = device_queue.summary()
+    snapshot["clients"] = session_tracker.count()
+    if reset:
+        stats.reset()
+    return snapshot
+
+
+def _write_prometheus_periodically(path: Path, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        stats.write_prometheus(path)
+
+
+# 当前的会话录制，未录制时为 None
+_recorder: Optional[SessionRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def _start_recording(directory: Path) -> Path:
+    global _recorder
+    with _recorder_lock:
+        if _recorder is not None:
+            return _recorder.directory
+        _recorder = SessionRecorder(directory)
+        stats.add_observer(_recorder.record_call)
+        frame_cache.on_capture = _recorder.record_frame
+        return directory
+
+
+def _stop_recording() -> bool:
+    global _recorder
+    with _recorder_lock:
+        recorder, _recorder = _recorder, None
+        if recorder is None:
+            return False
+        stats.remove_observer(recorder.record_call)
+        frame_cache.on_capture = None
+    recorder.close()
+    return True
+
+
+@mcp.tool(
+    name="start_recording",
+    description="""
+    开始录制会话：此后的每次工具调用（参数、耗时、返回值）与实际截取的屏幕帧
+    都会追加写入磁盘上的会话日志，用于复现问题和离线回放。
+
+    参数：
+    - directory: 会话日志目录（可选），缺省时在服务目录下的 sessions 子目录中按时间新建
+
+    返回值：
+    - 成功：返回会话日志目录的绝对路径；已在录制时返回当前录制的目录
+    - 失败：返回 None（目录无法创建）
+
+    说明：
+    工具调用以 gzip 压缩的 JSONL 格式记录，截图按内容去重后以 PNG 保存。
+    """,
+)
+@stats.timed_tool
+async def start_recording(directory: Optional[str] = None) -> Optional[str]:
+    if directory:
+        path = Path(directory)
+    else:
+        path = (
+            Path(__file__).parent / "sessions" / time.strftime("session_%Y%m%d_%H%M%S")
+        )
+    try:
+        path = await run_blocking(_start_recording, path)
+    except OSError:
+        return None
+    return str(path.absolute())
+
+
+@mcp.tool(
+    name="stop_recording",
+    description="""
+    停止会话录制，等待已提交的日志与截图全部写入磁盘。
+
+    返回值：
+    - 成功：返回 True
+    - 失败：返回 False（当前未在录制）
+    """,
+)
+@stats.timed_tool
+async def stop_recording() -> bool:
+    return await run_blocking(_stop_recording)
+
+
+@mcp.tool(
+    name="replay_session",
+    description="""
+    使用录制的会话日志创建离线回放控制器，按录制顺序返回当时截取的屏幕帧，无需连接真实设备。
+    可配合 load_resource() 与 create_tasker() 对真实画面重新执行 ocr()、find_image()、run_task() 等。
+
+    参数：
+    - directory: 会话日志目录，由 start_recording() 返回
+    - controller_id: 录制时的控制器 ID（可选），会话中包含多个设备时用于指定回放哪一个，
+      缺省时回放全部帧
+
+    返回值：
+    - 成功：返回回放控制器 ID（字符串），用法与 connect_adb_device() 返回的控制器 ID 相同
+    - 失败：返回 None（目录无效或没有匹配的截图帧）
+
+    说明：
+    每次截图返回下一帧，最后一帧之后保持不变；点击等操作直接返回成功。
+    """,
+)
+@stats.timed_tool
+async def replay_session(
+    directory: str, controller_id: Optional[str] = None
+) -> Optional[str]:
+    return await run_blocking(_replay_session, Path(directory), controller_id)
+
+
+def _replay_session(directory: Path, controller_id: Optional[str]) -> Optional[str]:
+    from mcp_server.replay_controller import FrameReplayController
+
+    # 帧事件的 key 为截图所属的控制器 ID
+    frames = [
+        load_frame(directory, event["hash"])
+        for event in read_events(directory)
+        if event["type"] == "frame"
+        and (controller_id is None or event["key"] == controller_id)
+    ]
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+    controller = FrameReplayController(
+        frames, advance_on_input=False, advance_on_screencap=True
+    )
+    if not controller.post_connection().wait().succeeded:
+        return None
+    return object_registry.register(
+        controller, "controller", on_release=_release_controller
+    )
+
 
+# 配置后定期将统计写入 Prometheus 文本文件，可配合 node_exporter textfile collector 使用
+_prometheus_file = os.environ.get("MAA_MCP_STATS_PROM_FILE")
+if _prometheus_file:
+    threading.Thread(
+        target=_write_prometheus_periodically,
+        args=(Path(_prometheus_file), 15.0),
+        name="maa-mcp-stats",
+        daemon=True,
+    ).start()
 
-def cleanup_screenshots():
-    """清理当前会话保存的临时截图文件"""
-    for filepath in _saved_screenshots:
-        filepath.unlink(missing_ok=True)
-    _saved_screenshots.clear()
 
+_record_dir = os.environ.get("MAA_MCP_RECORD_DIR")
+if _record_dir:
+    _start_recording(Path(_record_dir))
 
-atexit.register(cleanup_screenshots)
+atexit.register(screenshot_store.cleanup)
+atexit.register(_stop_recording)
+atexit.register(ocr_cache.save)
+atexit.register(nav_graph.save)
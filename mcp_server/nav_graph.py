@@ -0,0 +1,236 @@
+import heapq
+import json
+import re
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+# 画面指纹比较：感知哈希汉明距离上限，以及 OCR 锚点文字的最低重合度（Jaccard）
+HASH_DISTANCE = 40
+ANCHOR_SIMILARITY = 0.6
+# 没有锚点文字的画面只能依靠感知哈希区分，使用更严格的距离上限
+HASH_DISTANCE_WITHOUT_ANCHORS = 16
+# 每个画面最多保留的锚点文字数
+MAX_ANCHORS = 16
+# 锚点文字的最低置信度
+ANCHOR_MIN_SCORE = 0.7
+# 纯数字、时间、百分比等易变文字不作为锚点
+_VOLATILE_TEXT = re.compile(r"[\d\s.,:：%/+\-×xX]+")
+
+
+@dataclass
+class ScreenState:
+    state_id: str
+    # 截图分辨率 (width, height)，分辨率不同的画面坐标不通用
+    resolution: tuple[int, int]
+    phash: int
+    anchors: list[str]
+    name: Optional[str] = None
+    seen: int = 1
+
+
+@dataclass
+class Transition:
+    source: str
+    target: str
+    # 操作列表，格式同 run_actions
+    actions: list[dict[str, Any]]
+    successes: int = 1
+    failures: int = 0
+
+    @property
+    def cost(self) -> float:
+        """路径代价：执行后未到达目标画面的次数越多，代价越高"""
+        return 1.0 + self.failures / max(1, self.successes)
+
+
+def screen_anchors(results: list) -> list[str]:
+    """从 OCR 结果中选取置信度高、内容稳定的文字作为画面锚点"""
+    texts = [
+        result.text.strip()
+        for result in sorted(results, key=lambda result: result.score, reverse=True)
+        if result.score >= ANCHOR_MIN_SCORE
+        and len(result.text.strip()) >= 2
+        and not _VOLATILE_TEXT.fullmatch(result.text.strip())
+    ]
+    return sorted(list(dict.fromkeys(texts))[:MAX_ANCHORS])
+
+
+def _similarity(a: list[str], b: list[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(set(a) & set(b)) / len(set(a) | set(b))
+
+
+class NavigationGraph:
+    def __init__(self, path: Optional[Path] = None):
+        """
+        初始化导航图：节点为按画面指纹区分的画面状态，边为在两个画面之间切换的操作序列
+
+        path 不为 None 时可通过 load / save 在服务重启间保留学习到的导航图。
+        """
+        self.path = path
+        self._states: dict[str, ScreenState] = {}
+        self._transitions: list[Transition] = []
+        self._lock = threading.Lock()
+
+    def identify(
+        self, resolution: tuple[int, int], phash: int, anchors: list[str]
+    ) -> Optional[ScreenState]:
+        """返回指纹最接近的已知画面，没有足够接近的画面时返回 None"""
+        with self._lock:
+            return self._identify(resolution, phash, anchors)
+
+    def _identify(
+        self, resolution: tuple[int, int], phash: int, anchors: list[str]
+    ) -> Optional[ScreenState]:
+        best, best_distance = None, None
+        for state in self._states.values():
+            if state.resolution != resolution:
+                continue
+            distance = (state.phash ^ phash).bit_count()
+            if state.anchors or anchors:
+                matched = (
+                    distance <= HASH_DISTANCE
+                    and _similarity(state.anchors, anchors) >= ANCHOR_SIMILARITY
+                )
+            else:
+                matched = distance <= HASH_DISTANCE_WITHOUT_ANCHORS
+            if matched and (best_distance is None or distance < best_distance):
+                best, best_distance = state, distance
+        return best
+
+    def observe(
+        self, resolution: tuple[int, int], phash: int, anchors: list[str]
+    ) -> ScreenState:
+        """记录一次看到的画面，未知画面作为新状态加入导航图"""
+        with self._lock:
+            state = self._identify(resolution, phash, anchors)
+            if state is not None:
+                state.seen += 1
+                return state
+            state = ScreenState(uuid.uuid4().hex[:8], resolution, phash, anchors)
+            self._states[state.state_id] = state
+            return state
+
+    def add_transition(
+        self, source: str, target: str, actions: list[dict[str, Any]]
+    ) -> Transition:
+        """记录一次成功的画面切换，相同操作再次成功时只增加成功次数"""
+        with self._lock:
+            for transition in self._transitions:
+                if (
+                    transition.source == source
+                    and transition.target == target
+                    and transition.actions == actions
+                ):
+                    transition.successes += 1
+                    return transition
+            transition = Transition(source, target, actions)
+            self._transitions.append(transition)
+            return transition
+
+    def mark_failed(self, transition: Transition) -> None:
+        with self._lock:
+            transition.failures += 1
+
+    def rename(self, state_id: str, name: str) -> bool:
+        """为画面命名，名称唯一，原先使用该名称的画面会被取消命名"""
+        with self._lock:
+            state = self._states.get(state_id)
+            if state is None:
+                return False
+            for other in self._states.values():
+                if other.name == name:
+                    other.name = None
+            state.name = name
+            return True
+
+    def resolve(self, name_or_id: str) -> Optional[ScreenState]:
+        """按名称或状态 ID 查找画面"""
+        with self._lock:
+            state = self._states.get(name_or_id)
+            if state is not None:
+                return state
+            return next(
+                (s for s in self._states.values() if s.name == name_or_id),
+                None,
+            )
+
+    def states(self) -> list[ScreenState]:
+        with self._lock:
+            return list(self._states.values())
+
+    def transitions_from(self, state_id: str) -> list[Transition]:
+        with self._lock:
+            return [t for t in self._transitions if t.source == state_id]
+
+    def shortest_path(
+        self, source: str, target: str, exclude: Sequence[Transition] = ()
+    ) -> Optional[list[Transition]]:
+        """按边的代价查找代价最小的已知路径，跳过 exclude 中的边，不可达时返回 None"""
+        with self._lock:
+            outgoing: dict[str, list[Transition]] = {}
+            for transition in self._transitions:
+                if not any(transition is excluded for excluded in exclude):
+                    outgoing.setdefault(transition.source, []).append(transition)
+        costs = {source: 0.0}
+        routes: dict[str, list[Transition]] = {source: []}
+        queue = [(0.0, source)]
+        while queue:
+            cost, state_id = heapq.heappop(queue)
+            if state_id == target:
+                return routes[state_id]
+            if cost > costs[state_id]:
+                continue
+            for transition in outgoing.get(state_id, []):
+                next_cost = cost + transition.cost
+                if next_cost < costs.get(transition.target, float("inf")):
+                    costs[transition.target] = next_cost
+                    routes[transition.target] = routes[state_id] + [transition]
+                    heapq.heappush(queue, (next_cost, transition.target))
+        return None
+
+    def save(self) -> None:
+        """将导航图写入 path（JSON），先写临时文件再替换"""
+        if self.path is None:
+            return
+        with self._lock:
+            data = {
+                "states": [
+                    {**asdict(state), "phash": f"{state.phash:x}"}
+                    for state in self._states.values()
+                ],
+                "transitions": [asdict(t) for t in self._transitions],
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.path)
+
+    def load(self) -> int:
+        """从 path 读取导航图，文件不存在或损坏时忽略，返回读取的画面数"""
+        if self.path is None or not self.path.is_file():
+            return 0
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            states = [
+                ScreenState(
+                    item["state_id"],
+                    tuple(item["resolution"]),
+                    int(item["phash"], 16),
+                    list(item["anchors"]),
+                    item.get("name"),
+                    item.get("seen", 1),
+                )
+                for item in data["states"]
+            ]
+            transitions = [Transition(**item) for item in data["transitions"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+        with self._lock:
+            self._states = {state.state_id: state for state in states}
+            self._transitions = transitions
+        return len(states)
@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence
+
+from mcp_server.screenshot import prepare_image
+from mcp_server.signature import make_signature, signature_changed, to_gray
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# 感知哈希（dHash）的网格边长，哈希共 HASH_SIZE * HASH_SIZE 位
+HASH_SIZE = 16
+# 感知哈希汉明距离不超过该值的画面作为候选
+HASH_DISTANCE = 24
+
+
+@dataclass
+class _Entry:
+    # 截图分辨率、识别区域与识别参数
+    scope: str
+    phash: int
+    signature: numpy.ndarray
+    results: list
+
+
+def perceptual_hash(image: numpy.ndarray) -> int:
+    """计算差值哈希：缩小为灰度网格后比较相邻像素的明暗"""
+    import cv2
+    import numpy
+
+    small = cv2.resize(
+        to_gray(image), (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA
+    )
+    bits = numpy.packbits(small[:, 1:] > small[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class OcrResultCache:
+    def __init__(self, max_entries: int, path: Optional[Path] = None):
+        """
+        初始化 OCR 结果缓存，超出 max_entries 时淘汰最久未使用的结果
+
+        识别范围与参数相同、感知哈希相近的画面作为候选，再逐像素比较缩小后的灰度图，
+        文字有变化（如数字增减）时不会返回旧结果。
+        path 不为 None 时可通过 load / save 在服务重启间保留缓存。
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        image: numpy.ndarray,
+        roi: Optional[Sequence[int]],
+        params: str,
+        compute: Callable[[], Optional[list]],
+        signature: Optional[numpy.ndarray] = None,
+    ) -> Optional[list]:
+        """
+        命中时直接返回缓存的结果，否则调用 compute 识别并写入缓存
+
+        signature 为整帧的校验图（如帧缓存中已计算的），未指定 roi 时直接复用。
+        """
+        if self.max_entries <= 0:
+            return compute()
+
+        region = prepare_image(image, 0, roi)
+        if region.size == 0:
+            return compute()
+        scope = f"{image.shape[:2]}|{list(roi) if roi else None}|{params}"
+        phash = perceptual_hash(region)
+        if roi or signature is None:
+            signature = make_signature(region)
+        with self._lock:
+            for entry_id, entry in reversed(self._entries.items()):
+                if (
+                    entry.scope == scope
+                    and (entry.phash ^ phash).bit_count() <= HASH_DISTANCE
+                    and not signature_changed(entry.signature, signature)
+                ):
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return list(entry.results)
+            self.misses += 1
+
+        results = compute()
+        if results is not None:
+            self._put(_Entry(scope, phash, signature, list(results)))
+        return results
+
+    def _put(self, entry: _Entry) -> None:
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def save(self) -> None:
+        """将缓存写入 path（numpy 压缩格式），先写临时文件再替换"""
+        if self.path is None:
+            return
+        import numpy
+
+        with self._lock:
+            entries = list(self._entries.values())
+        meta = [
+            {
+                "scope": entry.scope,
+                "phash": f"{entry.phash:x}",
+                "results": [
+                    [result.text, list(result.box), result.score]
+                    for result in entry.results
+                ],
+            }
+            for entry in entries
+        ]
+        arrays = {f"sig{index}": entry.signature for index, entry in enumerate(entries)}
+        meta_json = json.dumps(meta, ensure_ascii=False)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as file:
+            numpy.savez_compressed(file, meta=numpy.array(meta_json), **arrays)
+        tmp.replace(self.path)
+
+    def load(self) -> int:
+        """从 path 读取缓存，文件不存在或损坏时忽略，返回读取的条目数"""
+        if self.path is None or self.max_entries <= 0 or not self.path.is_file():
+            return 0
+        import numpy
+        from maa.define import OCRResult, Rect
+
+        try:
+            with numpy.load(self.path) as data:
+                meta = json.loads(str(data["meta"]))
+                loaded = [
+                    _Entry(
+                        item["scope"],
+                        int(item["phash"], 16),
+                        data[f"sig{index}"],
+                        [
+                            OCRResult(box=Rect(*box), score=score, text=text)
+                            for text, box, score in item["results"]
+                        ],
+                    )
+                    for index, item in enumerate(meta)
+                ]
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+        for entry in loaded:
+            self._put(entry)
+        return len(loaded)
@@ -0,0 +1,92 @@
+import dataclasses
+import re
+from typing import Any, Optional, Sequence
+
+
+# 文字相同且重叠度超过该值的文本框视为重复，仅保留置信度最高者
+DEDUPE_IOU = 0.5
+
+
+def _iou(a: Sequence[int], b: Sequence[int]) -> float:
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _center_in(box: Sequence[int], roi: Sequence[int]) -> bool:
+    cx, cy = box[0] + box[2] / 2, box[1] + box[3] / 2
+    return roi[0] <= cx < roi[0] + roi[2] and roi[1] <= cy < roi[1] + roi[3]
+
+
+def filter_results(
+    results: list,
+    min_score: float = 0.0,
+    text_pattern: Optional[str] = None,
+    roi: Optional[Sequence[int]] = None,
+    dedupe: bool = True,
+) -> list:
+    """
+    按置信度、文本正则与区域过滤 OCR 结果
+
+    dedupe 为 True 时去除重复文本框并按位置排序，否则保持原有顺序。
+    text_pattern 为非法正则时抛出 re.error。
+    """
+    pattern = re.compile(text_pattern) if text_pattern else None
+    if dedupe:
+        results = sorted(results, key=lambda result: result.score, reverse=True)
+    kept: list = []
+    for result in results:
+        box = tuple(result.box)
+        if result.score < min_score:
+            continue
+        if pattern and not pattern.search(result.text):
+            continue
+        if roi and not _center_in(box, roi):
+            continue
+        if dedupe and any(
+            other.text == result.text and _iou(tuple(other.box), box) > DEDUPE_IOU
+            for other in kept
+        ):
+            continue
+        kept.append(result)
+    if dedupe:
+        kept.sort(key=lambda result: (result.box[0], result.box[1]))
+    return kept
+
+
+def compact_result(result: Any) -> dict[str, Any]:
+    """转换为紧凑格式：整数文本框 [x, y, w, h] 与保留两位小数的置信度"""
+    return {
+        "text": result.text,
+        "box": [int(value) for value in result.box],
+        "score": round(float(result.score), 2),
+    }
+
+
+def best_match(results: list) -> Optional[dict[str, Any]]:
+    """返回置信度最高的结果及其中心点坐标"""
+    if not results:
+        return None
+    best = max(results, key=lambda result: result.score)
+    x, y, w, h = (int(value) for value in best.box)
+    return {
+        "text": best.text,
+        "x": x + w // 2,
+        "y": y + h // 2,
+        "box": [x, y, w, h],
+        "score": round(float(best.score), 2),
+    }
+
+
+def scale_results(results: list, factor: float) -> list:
+    """将识别结果的文本框坐标乘以 factor，用于从缩放后的截图映射回设备坐标"""
+    if factor == 1.0:
+        return results
+    scaled = []
+    for result in results:
+        x, y, w, h = (round(value * factor) for value in result.box)
+        box = type(result.box)(x, y, w, h)
+        scaled.append(dataclasses.replace(result, box=box))
+    return scaled
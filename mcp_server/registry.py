@@ -1,38 +1,286 @@
+import threading
+import time
 import uuid
-from typing import Any, Optional
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from mcp_server.sessions import current_session
+from mcp_server.stats import stats
+
+
+@dataclass
+class _Entry:
+    obj: Any
+    kind: str
+    depends_on: tuple[str, ...] = ()
+    on_release: Optional[Callable[[str, Any], None]] = None
+    # 引用计数：正在使用该对象的调用数 + 依赖该对象的其他对象数
+    refs: int = 0
+    last_used: float = field(default_factory=time.monotonic)
+    lock: threading.RLock = field(default_factory=threading.RLock)
+    # 可见该对象的客户端会话；None 表示所有会话共享（如设备、窗口）
+    owners: Optional[set[str]] = None
+
+
+def _finalize(removed: list[tuple[str, _Entry]]) -> None:
+    """在注册表锁之外执行释放回调，避免回调中的阻塞操作拖住其他调用"""
+    for object_id, entry in removed:
+        if entry.on_release is not None:
+            entry.on_release(object_id, entry.obj)
+
+
+def _visible(entry: _Entry) -> bool:
+    session_id = current_session.get()
+    return session_id is None or entry.owners is None or session_id in entry.owners
 
 
 class ObjectRegistry:
     def __init__(self):
         """初始化对象注册表"""
-        self._objects: dict[str, Any] = {}
+        # 按类型划分命名空间，避免设备名等外部名称覆盖其他对象
+        self._namespaces: dict[str, dict[str, _Entry]] = {}
+        self._lock = threading.RLock()
 
-    def register(self, obj: Any) -> str:
+    def register(
+        self,
+        obj: Any,
+        kind: str = "object",
+        depends_on: Iterable[str] = (),
+        on_release: Optional[Callable[[str, Any], None]] = None,
+    ) -> str:
         object_id = str(uuid.uuid4())
-        self._objects[object_id] = obj
+        self._add(object_id, obj, kind, depends_on, on_release)
         return object_id
 
-    def register_by_name(self, name: str, obj: Any) -> str:
-        self._objects[name] = obj
+    def register_by_name(self, name: str, obj: Any, kind: str = "object") -> str:
+        """按名称注册，仅会覆盖同一命名空间内的同名对象；按名称注册的对象对所有会话可见"""
+        with self._lock:
+            existing = self._lookup(name, kind, scoped=False)
+            removed = self._remove(name, kind) if existing else None
+            self._add(name, obj, kind, (), None, shared=True)
+        _finalize([(name, removed)] if removed else [])
         return name
 
-    def get(self, object_id: str) -> Optional[Any]:
-        return self._objects.get(object_id)
+    def get(self, object_id: str, kind: Optional[str] = None) -> Optional[Any]:
+        entry = self._lookup(object_id, kind)
+        if entry is None:
+            return None
+        entry.last_used = time.monotonic()
+        return entry.obj
 
-    def unregister(self, object_id: str) -> bool:
-        if object_id in self._objects:
-            del self._objects[object_id]
+    def replace(self, object_id: str, obj: Any, kind: Optional[str] = None) -> bool:
+        """替换已注册的对象，保留其 ID、依赖关系与各会话的使用权"""
+        with self._lock:
+            entry = self._lookup(object_id, kind, scoped=False)
+            if entry is None:
+                return False
+            entry.obj = obj
+            return True
+
+    def grant(self, object_id: str, kind: Optional[str] = None) -> bool:
+        """让当前会话也能使用已注册的对象，用于多个客户端共用连接池中的控制器与资源"""
+        session_id = current_session.get()
+        with self._lock:
+            entry = self._lookup(object_id, kind, scoped=False)
+            if entry is None:
+                return False
+            if entry.owners is not None and session_id is not None:
+                entry.owners.add(session_id)
             return True
-        return False
 
-    def list(self) -> list[str]:
-        return list(self._objects.keys())
+    def kind_of(self, object_id: str) -> Optional[str]:
+        entry = self._lookup(object_id, None)
+        return entry.kind if entry else None
+
+    @contextmanager
+    def use(
+        self, object_id: str, kind: Optional[str] = None
+    ) -> Iterator[Optional[Any]]:
+        """
+        独占使用对象
+
+        持有对象锁期间同一对象的其他调用将排队等待，引用计数保证对象不会在使用中被回收。
+        对象不存在时产出 None。
+        """
+        with stats.span("registry", object_id):
+            with self._lock:
+                entry = self._lookup(object_id, kind)
+                if entry is not None:
+                    entry.refs += 1
+            if entry is not None:
+                # 计入等待对象锁的时间，用于观察同一对象上的调用排队情况
+                entry.lock.acquire()
+        if entry is None:
+            yield None
+            return
+        try:
+            entry.last_used = time.monotonic()
+            yield entry.obj
+        finally:
+            entry.lock.release()
+            with self._lock:
+                entry.refs -= 1
+                entry.last_used = time.monotonic()
+
+    def release(self, object_id: str, kind: Optional[str] = None) -> bool:
+        """
+        释放对象，对象仍被使用或被其他对象依赖时返回 False
+
+        对象同时被其他会话使用时，仅对当前会话隐藏该对象。
+        """
+        session_id = current_session.get()
+        with self._lock:
+            entry = self._lookup(object_id, kind)
+            if entry is None:
+                return False
+            if entry.owners is not None and entry.owners - {session_id}:
+                entry.owners.discard(session_id)
+                return True
+            if entry.refs > 0:
+                return False
+            self._remove(object_id, entry.kind)
+        _finalize([(object_id, entry)])
+        return True
+
+    def evict_idle(self, ttl: float, kinds: Iterable[str]) -> list[str]:
+        """释放指定类型中空闲超过 ttl 秒且未被引用的对象，返回被释放的 ID"""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            # 按 kinds 顺序处理：先传入依赖方（如任务管理器），
+            # 其依赖的控制器与资源即可在同一轮中释放
+            for kind in kinds:
+                for object_id, entry in list(self._namespaces.get(kind, {}).items()):
+                    if entry.refs == 0 and now - entry.last_used > ttl:
+                        self._remove(object_id, kind)
+                        evicted.append((object_id, entry))
+        _finalize(evicted)
+        return [object_id for object_id, _ in evicted]
+
+    def end_session(self, session_id: str, kinds: Iterable[str]) -> list[str]:
+        """
+        会话结束时收回其对所有对象的使用权，并释放不再被任何会话使用的对象
+
+        按 kinds 顺序处理，与 evict_idle 相同；仍在使用中的对象留待空闲回收。
+        """
+        released = []
+        with self._lock:
+            for namespace in self._namespaces.values():
+                for entry in namespace.values():
+                    if entry.owners is not None:
+                        entry.owners.discard(session_id)
+            for kind in kinds:
+                for object_id, entry in list(self._namespaces.get(kind, {}).items()):
+                    if entry.owners == set() and entry.refs == 0:
+                        self._remove(object_id, kind)
+                        released.append((object_id, entry))
+        _finalize(released)
+        return [object_id for object_id, _ in released]
+
+    def sessions(self) -> list[dict[str, Any]]:
+        """列出所有已注册对象的类型、引用计数与空闲时长"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "id": object_id,
+                    "kind": kind,
+                    "refs": entry.refs,
+                    "depends_on": list(entry.depends_on),
+                    "idle_seconds": round(now - entry.last_used, 1),
+                    "clients": None if entry.owners is None else len(entry.owners),
+                }
+                for kind, namespace in self._namespaces.items()
+                for object_id, entry in namespace.items()
+                if _visible(entry)
+            ]
+
+    def unregister(self, object_id: str) -> bool:
+        with self._lock:
+            entry = self._lookup(object_id, None)
+            if entry is None:
+                return False
+            self._remove(object_id, entry.kind)
+        _finalize([(object_id, entry)])
+        return True
+
+    def list(self, kind: Optional[str] = None) -> list[str]:
+        with self._lock:
+            if kind is not None:
+                return [
+                    object_id
+                    for object_id, entry in self._namespaces.get(kind, {}).items()
+                    if _visible(entry)
+                ]
+            return [
+                object_id
+                for namespace in self._namespaces.values()
+                for object_id, entry in namespace.items()
+                if _visible(entry)
+            ]
 
     def clear(self) -> None:
-        self._objects.clear()
+        with self._lock:
+            removed = [
+                (object_id, self._remove(object_id, kind))
+                for kind, namespace in list(self._namespaces.items())
+                for object_id in list(namespace)
+            ]
+        _finalize(removed)
 
     def count(self) -> int:
-        return len(self._objects)
+        with self._lock:
+            return sum(len(namespace) for namespace in self._namespaces.values())
 
     def exists(self, object_id: str) -> bool:
-        return object_id in self._objects
+        return self._lookup(object_id, None) is not None
+
+    def _add(
+        self,
+        object_id: str,
+        obj: Any,
+        kind: str,
+        depends_on: Iterable[str],
+        on_release: Optional[Callable[[str, Any], None]],
+        shared: bool = False,
+    ) -> None:
+        session_id = current_session.get()
+        with self._lock:
+            depends_on = tuple(depends_on)
+            for dependency_id in depends_on:
+                dependency = self._lookup(dependency_id, None, scoped=False)
+                if dependency is not None:
+                    dependency.refs += 1
+            entry = _Entry(obj, kind, depends_on, on_release)
+            # 在客户端会话中注册的对象仅对该会话可见
+            if session_id is not None and not shared:
+                entry.owners = {session_id}
+            self._namespaces.setdefault(kind, {})[object_id] = entry
+
+    def _remove(self, object_id: str, kind: str) -> _Entry:
+        entry = self._namespaces[kind].pop(object_id)
+        for dependency_id in entry.depends_on:
+            dependency = self._lookup(dependency_id, None, scoped=False)
+            if dependency is not None:
+                dependency.refs -= 1
+        return entry
+
+    def _lookup(
+        self, object_id: str, kind: Optional[str], scoped: bool = True
+    ) -> Optional[_Entry]:
+        """查找对象；scoped 为 True 时对当前会话不可见的对象视为不存在"""
+        if kind is not None:
+            entry = self._namespaces.get(kind, {}).get(object_id)
+        else:
+            entry = next(
+                (
+                    namespace[object_id]
+                    for namespace in list(self._namespaces.values())
+                    if object_id in namespace
+                ),
+                None,
+            )
+        if entry is not None and scoped and not _visible(entry):
+            return None
+        return entry
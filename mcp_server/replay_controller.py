@@ -0,0 +1,106 @@
+import time
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy
+from maa.controller import CustomController
+
+
+class FrameReplayController(CustomController):
+    """
+    回放预先录制的截图帧的离线控制器
+
+    截图返回当前帧，输入操作直接返回成功并切换到下一帧，以模拟操作后的画面变化；
+    advance_on_screencap 为 True 时改为每次截图后切换到下一帧，最后一帧保持不变。
+    用于基准测试与离线回放，无需连接真实设备。
+    """
+
+    def __init__(
+        self,
+        frames: list[numpy.ndarray],
+        screencap_latency: float = 0.0,
+        input_latency: float = 0.0,
+        advance_on_input: bool = True,
+        advance_on_screencap: bool = False,
+    ):
+        if not frames:
+            raise ValueError("frames must not be empty")
+        super().__init__()
+        self.frames = frames
+        self.index = 0
+        # 模拟真实设备的截图与输入耗时（秒）
+        self.screencap_latency = screencap_latency
+        self.input_latency = input_latency
+        self.advance_on_input = advance_on_input
+        self.advance_on_screencap = advance_on_screencap
+
+    @classmethod
+    def from_directory(
+        cls, directory: Union[str, Path], **kwargs
+    ) -> "FrameReplayController":
+        """按文件名顺序加载目录中的 PNG / JPG 截图"""
+        paths = sorted(
+            path
+            for path in Path(directory).iterdir()
+            if path.suffix.lower() in (".png", ".jpg", ".jpeg")
+        )
+        frames = [cv2.imread(str(path)) for path in paths]
+        return cls([frame for frame in frames if frame is not None], **kwargs)
+
+    def _input(self) -> bool:
+        if self.input_latency:
+            time.sleep(self.input_latency)
+        if self.advance_on_input:
+            self.index = (self.index + 1) % len(self.frames)
+        return True
+
+    def connect(self) -> bool:
+        return True
+
+    def request_uuid(self) -> str:
+        return f"frame-replay-{id(self)}"
+
+    def start_app(self, intent: str) -> bool:
+        return True
+
+    def stop_app(self, intent: str) -> bool:
+        return True
+
+    def screencap(self) -> numpy.ndarray:
+        if self.screencap_latency:
+            time.sleep(self.screencap_latency)
+        frame = self.frames[self.index]
+        if self.advance_on_screencap:
+            self.index = min(self.index + 1, len(self.frames) - 1)
+        return frame
+
+    def click(self, x: int, y: int) -> bool:
+        return self._input()
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int) -> bool:
+        return self._input()
+
+    def touch_down(self, contact: int, x: int, y: int, pressure: int) -> bool:
+        return True
+
+    def touch_move(self, contact: int, x: int, y: int, pressure: int) -> bool:
+        return True
+
+    def touch_up(self, contact: int) -> bool:
+        return self._input()
+
+    def click_key(self, keycode: int) -> bool:
+        return self._input()
+
+    def input_text(self, text: str) -> bool:
+        return self._input()
+
+    def key_down(self, keycode: int) -> bool:
+        return True
+
+    def key_up(self, keycode: int) -> bool:
+        return self._input()
+
+    def scroll(self, dx: int, dy: int) -> bool:
+        return self._input()
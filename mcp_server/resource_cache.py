@@ -0,0 +1,64 @@
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class CachedResource:
+    resource_id: str
+    fingerprint: str
+
+
+def bundle_fingerprint(path: Path) -> str:
+    """根据资源包内所有文件的相对路径、大小与修改时间计算指纹"""
+    digest = hashlib.sha1()
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        stat = file.stat()
+        relative = file.relative_to(path).as_posix()
+        digest.update(f"{relative}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class ResourceCache:
+    def __init__(self):
+        """初始化资源缓存，按资源包的绝对路径索引已加载的资源 ID"""
+        self._entries: dict[str, CachedResource] = {}
+        self._path_locks: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def path_lock(self, key: str) -> threading.Lock:
+        """同一资源包的加载串行执行，避免并发调用重复加载模型"""
+        with self._lock:
+            return self._path_locks.setdefault(key, threading.Lock())
+
+    def get(self, key: str) -> Optional[CachedResource]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(self, key: str, resource_id: str, fingerprint: str) -> None:
+        with self._lock:
+            self._entries[key] = CachedResource(resource_id, fingerprint)
+
+    def forget(self, resource_id: str) -> None:
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry.resource_id == resource_id:
+                    del self._entries[key]
+
+    def path_of(self, resource_id: str) -> Optional[Path]:
+        """返回资源 ID 对应的资源包路径"""
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.resource_id == resource_id:
+                    return Path(key)
+        return None
+
+    def fingerprint_of(self, resource_id: str) -> Optional[str]:
+        """返回资源 ID 对应资源包的内容指纹"""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.resource_id == resource_id:
+                    return entry.fingerprint
+        return None
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence
+
+from mcp_server.stats import stats
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# 支持的输出格式及对应的质量参数（OpenCV 常量名，编码时再解析）
+_FORMATS = {
+    "png": (".png", None),
+    "jpg": (".jpg", "IMWRITE_JPEG_QUALITY"),
+    "jpeg": (".jpg", "IMWRITE_JPEG_QUALITY"),
+    "webp": (".webp", "IMWRITE_WEBP_QUALITY"),
+}
+
+
+def prepare_image(
+    image: numpy.ndarray, max_side: int = 0, roi: Optional[Sequence[int]] = None
+) -> numpy.ndarray:
+    """按 roi [x, y, w, h] 裁剪，并将长边缩放至不超过 max_side（0 表示不缩放）"""
+    if roi:
+        x, y, w, h = (int(value) for value in roi)
+        image = image[max(0, y) : y + h, max(0, x) : x + w]
+    height, width = image.shape[:2]
+    if max_side > 0 and max(height, width) > max_side:
+        scale = max_side / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        import cv2
+
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+class ScreenshotStore:
+    def __init__(
+        self, directory: Path, max_files: int, max_bytes: int, encode_workers: int = 8
+    ):
+        """初始化截图存储，超出数量或总大小上限时删除最早的截图"""
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._files: deque[tuple[Path, int]] = deque()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # 编码在独立线程池执行，不占用 MaaFramework 任务的线程池；
+        # cv2.imencode 会释放 GIL，多台设备的截图可并行编码
+        self._encoder = ThreadPoolExecutor(
+            max_workers=max(1, encode_workers), thread_name_prefix="maa-mcp-encode"
+        )
+        self._adopt_existing()
+
+    def _adopt_existing(self) -> None:
+        """将上次异常退出遗留的截图纳入保留队列，由上限统一清理"""
+        if not self.directory.exists():
+            return
+        leftovers = sorted(
+            self.directory.glob("screenshot_*"), key=lambda path: path.stat().st_mtime
+        )
+        with self._lock:
+            for path in leftovers:
+                self._track(path, path.stat().st_size)
+            self._enforce_limits()
+
+    async def save(
+        self,
+        image: numpy.ndarray,
+        image_format: str = "png",
+        quality: int = 90,
+        max_side: int = 0,
+        roi: Optional[Sequence[int]] = None,
+    ) -> Optional[Path]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._encoder,
+            self._save_sync,
+            image,
+            image_format,
+            quality,
+            max_side,
+            roi,
+        )
+
+    def _save_sync(
+        self,
+        image: numpy.ndarray,
+        image_format: str,
+        quality: int,
+        max_side: int,
+        roi: Optional[Sequence[int]],
+    ) -> Optional[Path]:
+        if image_format.lower() not in _FORMATS:
+            return None
+        import cv2
+
+        suffix, quality_flag = _FORMATS[image_format.lower()]
+        with stats.span("encode"):
+            image = prepare_image(image, max_side, roi)
+            if image.size == 0:
+                return None
+            params = []
+            if quality_flag is not None:
+                params = [getattr(cv2, quality_flag), int(quality)]
+            success, buffer = cv2.imencode(suffix, image, params)
+        if not success:
+            return None
+
+        self.directory.mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        # 多个线程可能在同一微秒内完成编码，附加随机后缀避免文件名冲突
+        unique = uuid.uuid4().hex[:6]
+        filepath = self.directory / f"screenshot_{timestamp}_{unique}{suffix}"
+        filepath.write_bytes(buffer.tobytes())
+        with self._lock:
+            self._track(filepath, len(buffer))
+            self._enforce_limits()
+        return filepath
+
+    def _track(self, path: Path, size: int) -> None:
+        self._files.append((path, size))
+        self._total_bytes += size
+
+    def _enforce_limits(self) -> None:
+        # 至少保留最新的一张，保证刚返回的路径可读
+        while len(self._files) > 1 and (
+            len(self._files) > self.max_files or self._total_bytes > self.max_bytes
+        ):
+            path, size = self._files.popleft()
+            path.unlink(missing_ok=True)
+            self._total_bytes -= size
+
+    def cleanup(self) -> None:
+        """删除当前保留的全部截图文件"""
+        with self._lock:
+            for path, _ in self._files:
+                path.unlink(missing_ok=True)
+            self._files.clear()
+            self._total_bytes = 0
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import dataclasses
+import gzip
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+if TYPE_CHECKING:
+    import numpy
+
+
+EVENTS_FILE = "events.jsonl.gz"
+FRAMES_DIR = "frames"
+
+
+def frame_hash(image: numpy.ndarray) -> str:
+    """按图像尺寸与像素内容计算帧哈希，用于去重"""
+    import numpy
+
+    digest = hashlib.sha1(str(image.shape).encode())
+    digest.update(numpy.ascontiguousarray(image).data)
+    return digest.hexdigest()[:20]
+
+
+def to_jsonable(value: Any) -> Any:
+    """将工具参数与返回值转换为可写入 JSON 的结构"""
+    import numpy
+
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {
+            field.name: to_jsonable(getattr(value, field.name))
+            for field in dataclasses.fields(value)
+        }
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, numpy.ndarray):
+        return None
+    if isinstance(value, numpy.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class SessionRecorder:
+    def __init__(self, directory: Path):
+        """
+        初始化会话录制，将工具调用与截图帧追加写入 directory
+
+        工具调用与帧事件按顺序写入 gzip 压缩的 JSONL 文件，每条事件后刷新以便异常退出时保留已写入内容；
+        截图按内容哈希去重后以 PNG 保存在 frames 子目录。
+        """
+        self.directory = directory
+        (directory / FRAMES_DIR).mkdir(parents=True, exist_ok=True)
+        self._known = {path.stem for path in (directory / FRAMES_DIR).glob("*.png")}
+        self._file = gzip.open(directory / EVENTS_FILE, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+        # 编码与写入在独立线程串行执行，不阻塞工具调用与截图
+        self._writer = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="maa-mcp-record"
+        )
+        self._closed = False
+
+    def record_call(
+        self,
+        name: str,
+        arguments: dict[str, Any],
+        elapsed_ms: float,
+        result: Any = None,
+        error: bool = False,
+    ) -> None:
+        event = {
+            "type": "call",
+            "ts": time.time(),
+            "tool": name,
+            "args": to_jsonable(arguments),
+            "elapsed_ms": round(elapsed_ms, 3),
+            "result": to_jsonable(result),
+            "error": error,
+        }
+        self._submit(self._write_event, event)
+
+    def record_frame(self, key: str, image: numpy.ndarray) -> None:
+        """记录一次截图，内容相同的帧只保存一次"""
+        digest = frame_hash(image)
+        event = {"type": "frame", "ts": time.time(), "key": key, "hash": digest}
+        with self._lock:
+            new = digest not in self._known
+            self._known.add(digest)
+        if new:
+            self._submit(self._write_frame, digest, image.copy())
+        self._submit(self._write_event, event)
+
+    def _submit(self, func: Any, *args: Any) -> None:
+        with self._lock:
+            if not self._closed:
+                self._writer.submit(func, *args)
+
+    def _write_event(self, event: dict[str, Any]) -> None:
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def _write_frame(self, digest: str, image: numpy.ndarray) -> None:
+        import cv2
+
+        path = self.directory / FRAMES_DIR / f"{digest}.png"
+        tmp = path.with_suffix(".png.tmp")
+        success, buffer = cv2.imencode(".png", image)
+        if success:
+            tmp.write_bytes(buffer.tobytes())
+            tmp.replace(path)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._writer.shutdown(wait=True)
+        self._file.close()
+
+
+def read_events(directory: Path) -> Iterator[dict[str, Any]]:
+    """按写入顺序读取会话事件，忽略异常退出导致的不完整末尾"""
+    try:
+        with gzip.open(directory / EVENTS_FILE, "rt", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+    except (EOFError, gzip.BadGzipFile):
+        return
+
+
+def load_frame(directory: Path, digest: str) -> Optional[numpy.ndarray]:
+    import cv2
+
+    return cv2.imread(str(directory / FRAMES_DIR / f"{digest}.png"))
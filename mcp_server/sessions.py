@@ -0,0 +1,133 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from fastmcp.server.dependencies import get_http_request
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+# 当前工具调用所属的客户端会话 ID；服务内部线程与直接调用时为 None
+current_session: ContextVar[Optional[str]] = ContextVar("current_session", default=None)
+# 无状态 HTTP 请求没有传输层会话，彼此共用该会话 ID，但无法访问有状态会话创建的对象
+STATELESS_SESSION = "stateless"
+
+
+class SessionTracker:
+    def __init__(self):
+        """记录每个客户端会话最近一次调用工具的时间，用于回收断开的会话"""
+        self._last_seen: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: str) -> None:
+        with self._lock:
+            self._last_seen[session_id] = time.monotonic()
+
+    def expire(self, ttl: float) -> list[str]:
+        """移除并返回空闲超过 ttl 秒的会话"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                session_id
+                for session_id, last_seen in self._last_seen.items()
+                if now - last_seen > ttl
+            ]
+            for session_id in expired:
+                del self._last_seen[session_id]
+        return expired
+
+    def active(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._last_seen
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._last_seen)
+
+
+def _client_session() -> Optional[str]:
+    """
+    返回发起调用的传输层会话 ID，即服务端在握手时为有状态 HTTP 会话分配的 mcp-session-id
+
+    该 ID 由服务端生成，客户端无法通过请求参数冒用其他会话。没有会话 ID 的无状态 HTTP 请求
+    共用 STATELESS_SESSION；非 HTTP 传输（如 stdio 的单一客户端）返回 None，不做隔离。
+    """
+    try:
+        request = get_http_request()
+    except RuntimeError:
+        return None
+    return request.headers.get("mcp-session-id") or STATELESS_SESSION
+
+
+class SessionMiddleware(Middleware):
+    def __init__(self, tracker: SessionTracker):
+        """
+        在每次工具调用与资源读取期间设置 current_session
+
+        对象注册表据此按会话隔离 ID，画面订阅资源据此只对创建订阅的会话可读。
+        """
+        self.tracker = tracker
+
+    async def on_call_tool(
+        self, context: MiddlewareContext, call_next: CallNext
+    ) -> Any:
+        return await self._scoped(context, call_next)
+
+    async def on_read_resource(
+        self, context: MiddlewareContext, call_next: CallNext
+    ) -> Any:
+        return await self._scoped(context, call_next)
+
+    async def _scoped(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        session_id = _client_session()
+        if session_id is not None:
+            self.tracker.touch(session_id)
+        token = current_session.set(session_id)
+        try:
+            return await call_next(context)
+        finally:
+            current_session.reset(token)
+
+
+class DeviceLeases:
+    def __init__(self, ttl: float):
+        """
+        初始化设备租约：会话在设备上执行操作时获得该设备的租约，每次操作后续期
+
+        租约有效期内其他会话在该设备上的操作会被拒绝，避免多个客户端的操作交错执行。
+        ttl 为 0 时不进行仲裁。
+        """
+        self.ttl = ttl
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, device_id: str, session_id: Optional[str]) -> bool:
+        """为会话获取或续期设备租约，设备被其他会话占用时返回 False"""
+        if self.ttl <= 0 or session_id is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            holder = self._leases.get(device_id)
+            if holder and holder[0] != session_id and holder[1] > now:
+                return False
+            self._leases[device_id] = (session_id, now + self.ttl)
+            return True
+
+    def holder(self, device_id: str) -> Optional[str]:
+        with self._lock:
+            holder = self._leases.get(device_id)
+            if holder is None or holder[1] <= time.monotonic():
+                return None
+            return holder[0]
+
+    def release(self, device_id: str, session_id: Optional[str] = None) -> None:
+        """释放设备租约；指定 session_id 时仅释放该会话持有的租约"""
+        with self._lock:
+            holder = self._leases.get(device_id)
+            if holder and (session_id is None or holder[0] == session_id):
+                del self._leases[device_id]
+
+    def release_session(self, session_id: str) -> None:
+        with self._lock:
+            for device_id, holder in list(self._leases.items()):
+                if holder[0] == session_id:
+                    del self._leases[device_id]
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# 校验图的缩放倍数：缩略图对数字增减等小字变化不敏感，需在较高分辨率下比较
+SIGNATURE_SCALE = 0.25
+# 校验图单像素灰度差超过该值即视为画面变化
+SIGNATURE_THRESHOLD = 12
+
+
+def to_gray(image: numpy.ndarray) -> numpy.ndarray:
+    import cv2
+
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+def make_signature(image: numpy.ndarray) -> numpy.ndarray:
+    """将截图缩放为四分之一大小的灰度校验图"""
+    import cv2
+
+    height, width = image.shape[:2]
+    scaled = (round(width * SIGNATURE_SCALE), round(height * SIGNATURE_SCALE))
+    size = (max(1, scaled[0]), max(1, scaled[1]))
+    return cv2.resize(to_gray(image), size, interpolation=cv2.INTER_AREA)
+
+
+def signature_changed(old: numpy.ndarray, new: numpy.ndarray) -> bool:
+    """比较两张校验图，尺寸不同或任一像素灰度差超过阈值时视为变化"""
+    import cv2
+
+    if old.shape != new.shape:
+        return True
+    return old.size > 0 and int(cv2.absdiff(old, new).max()) > SIGNATURE_THRESHOLD
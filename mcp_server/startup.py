@@ -0,0 +1,72 @@
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+# 进程内最早的计时起点，用于统计导入与预热耗时
+STARTED = time.perf_counter()
+
+
+class Warmup:
+    def __init__(self):
+        """初始化后台预热，依次执行加载动态库、导入依赖、预加载资源等耗时步骤"""
+        self.steps: list[tuple[str, Callable[[], object]]] = []
+        # 各步骤耗时（毫秒），导入耗时记为 import
+        self.timings: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+        self.verbose = False
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_step(self, name: str, func: Callable[[], object]) -> None:
+        self.steps.append((name, func))
+
+    def mark(self, name: str) -> None:
+        """记录从进程启动到当前的耗时"""
+        self._report(name, (time.perf_counter() - STARTED) * 1000)
+
+    def start(self) -> None:
+        """在后台线程中执行预热步骤，重复调用无效"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="maa-mcp-warmup", daemon=True
+            )
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待预热完成；尚未开始预热时（如未经 MCP 生命周期直接调用）立即开始"""
+        if self._ready.is_set():
+            return True
+        self.start()
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def _run(self) -> None:
+        try:
+            for name, func in self.steps:
+                start = time.perf_counter()
+                try:
+                    func()
+                except Exception as e:
+                    # 预热失败不影响服务，对应的工具在首次使用时会再次尝试并返回失败
+                    self.errors[name] = repr(e)
+                self._report(name, (time.perf_counter() - start) * 1000)
+        finally:
+            self.mark("ready")
+            self._ready.set()
+
+    def _report(self, name: str, elapsed_ms: float) -> None:
+        self.timings[name] = round(elapsed_ms, 1)
+        if self.verbose:
+            # stdout 为 MCP stdio 通道，计时信息只能写入 stderr
+            print(f"[startup] {name}: {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+# 全局预热任务，服务启动后在后台执行，阻塞类工具在执行前等待其完成
+warmup = Warmup()
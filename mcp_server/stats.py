@@ -0,0 +1,211 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Awaitable, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 每个直方图保留的最近样本数
+WINDOW_SIZE = 1024
+# 从工具参数中识别设备维度的参数名
+_DEVICE_ARGS = ("controller_id", "tasker_id")
+
+
+class _Series:
+    def __init__(self):
+        self.samples: deque[float] = deque(maxlen=WINDOW_SIZE)
+        self.count = 0
+        self.errors = 0
+        self.failures = 0
+
+    def summary(self) -> dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "failures": self.failures,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1], 2) if ordered else None,
+        }
+
+
+class StatsRecorder:
+    def __init__(self, trace_path: Optional[Path] = None):
+        """初始化耗时统计，trace_path 非空时将每个耗时区间追加写入 JSONL 文件"""
+        self.trace_path = trace_path
+        self._series: dict[tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+        # 追踪文件保持打开，写入使用独立的锁，不阻塞统计更新
+        self._trace_file: Optional[IO[str]] = None
+        self._trace_lock = threading.Lock()
+        self._started = time.monotonic()
+        # 工具调用结束后的回调，参数为工具名、参数、耗时（毫秒）、返回值、是否抛出异常
+        self._observers: list[Callable[[str, dict, float, Any, bool], None]] = []
+
+    def record(
+        self,
+        group: str,
+        name: str,
+        elapsed_ms: float,
+        device: Optional[str] = None,
+        error: bool = False,
+        failure: bool = False,
+    ) -> None:
+        keys = [(group, name)]
+        if device:
+            keys.append(("device", f"{device}:{name}"))
+        with self._lock:
+            for key in keys:
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = _Series()
+                series.samples.append(elapsed_ms)
+                series.count += 1
+                series.errors += error
+                series.failures += failure
+        if self.trace_path is not None:
+            event = {
+                "ts": time.time(),
+                "group": group,
+                "name": name,
+                "device": device,
+                "elapsed_ms": round(elapsed_ms, 3),
+                "error": error,
+                "failure": failure,
+            }
+            line = json.dumps(event, ensure_ascii=False) + "\n"
+            with self._trace_lock:
+                if self._trace_file is None:
+                    self._trace_file = self.trace_path.open(
+                        "a", encoding="utf-8", buffering=1
+                    )
+                self._trace_file.write(line)
+
+    def forget_device(self, device: str) -> None:
+        """移除设备维度下该对象的所有统计，在控制器或任务管理器释放时调用"""
+        prefix = f"{device}:"
+        with self._lock:
+            for key in [
+                key
+                for key in self._series
+                if key[0] == "device" and key[1].startswith(prefix)
+            ]:
+                del self._series[key]
+
+    @contextmanager
+    def span(self, stage: str, device: Optional[str] = None) -> Iterator[None]:
+        """记录一个内部阶段（截图、识别、操作、编码、注册表查找）的耗时"""
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.record("stage", stage, elapsed_ms, device, error=error)
+
+    def add_observer(
+        self, observer: Callable[[str, dict, float, Any, bool], None]
+    ) -> None:
+        self._observers.append(observer)
+
+    def remove_observer(
+        self, observer: Callable[[str, dict, float, Any, bool], None]
+    ) -> None:
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    def _notify(
+        self, name: str, kwargs: dict, elapsed_ms: float, result: Any, error: bool
+    ) -> None:
+        for observer in list(self._observers):
+            observer(name, kwargs, elapsed_ms, result, error)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            result: dict[str, Any] = {
+                "uptime_seconds": round(time.monotonic() - self._started, 1),
+                "tools": {},
+                "stages": {},
+                "devices": {},
+            }
+            groups = {"tool": "tools", "stage": "stages", "device": "devices"}
+            for (group, name), series in sorted(self._series.items()):
+                result[groups.get(group, group)][name] = series.summary()
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._started = time.monotonic()
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = [
+            "# TYPE maa_mcp_latency_ms summary",
+            "# TYPE maa_mcp_calls_total counter",
+            "# TYPE maa_mcp_errors_total counter",
+        ]
+        snapshot = self.snapshot()
+        for group in ("tools", "stages", "devices"):
+            for name, summary in snapshot[group].items():
+                labels = f'group="{group}",name="{name}"'
+                for quantile in ("50", "95", "99"):
+                    value = summary[f"p{quantile}_ms"]
+                    if value is not None:
+                        quantile_labels = f'{labels},quantile="0.{quantile}"'
+                        lines.append(f"maa_mcp_latency_ms{{{quantile_labels}}} {value}")
+                lines.append(f"maa_mcp_calls_total{{{labels}}} {summary['count']}")
+                lines.append(f"maa_mcp_errors_total{{{labels}}} {summary['errors']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path) -> None:
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        tmp.replace(path)
+
+    def timed_tool(
+        self, func: Callable[..., Awaitable[T]]
+    ) -> Callable[..., Awaitable[T]]:
+        """为异步工具函数记录调用耗时；返回 None 或 False 计为失败"""
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            device = next(
+                (kwargs[name] for name in _DEVICE_ARGS if name in kwargs), None
+            )
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except BaseException:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self.record("tool", func.__name__, elapsed_ms, device, error=True)
+                self._notify(func.__name__, kwargs, elapsed_ms, None, True)
+                raise
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            failure = result is None or result is False
+            self.record("tool", func.__name__, elapsed_ms, device, failure=failure)
+            self._notify(func.__name__, kwargs, elapsed_ms, result, False)
+            return result
+
+        return wrapper
+
+
+_trace_file = os.environ.get("MAA_MCP_TRACE_FILE")
+# 全局耗时统计，各模块通过 stats.span() 记录内部阶段耗时
+stats = StatsRecorder(Path(_trace_file) if _trace_file else None)
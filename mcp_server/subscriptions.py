@@ -0,0 +1,95 @@
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Any, Optional
+
+# 每个订阅最多保留的未读事件数，超出时丢弃最早的事件
+MAX_PENDING_EVENTS = 20
+# 采样间隔（秒）：画面变化时使用最小间隔，持续不变时逐步放大至最大间隔
+MIN_INTERVAL = 0.1
+MAX_INTERVAL = 2.0
+
+
+class ScreenSubscription:
+    def __init__(
+        self,
+        controller_id: str,
+        roi: Optional[list[int]],
+        mode: str,
+        tasker_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ):
+        """
+        初始化画面订阅：后台采样器在区域变化时发布事件，客户端通过 next_events 取回
+
+        mode 为 "change" 时只报告变化与稳定，为 "ocr" 时稳定事件附带该区域的 OCR 结果。
+        """
+        self.subscription_id = uuid.uuid4().hex
+        self.controller_id = controller_id
+        self.roi = roi
+        self.mode = mode
+        self.tasker_id = tasker_id
+        self.session_id = session_id
+        self.uri = f"screen://subscriptions/{self.subscription_id}"
+        self.sequence = 0
+        self.latest: Optional[dict[str, Any]] = None
+        self.ended = False
+        self.task: Optional[asyncio.Task] = None
+        # 客户端最近一次读取事件或订阅结束的时间，用于回收无人读取的订阅
+        self.last_active = time.monotonic()
+        self._pending: deque[dict[str, Any]] = deque(maxlen=MAX_PENDING_EVENTS)
+        self._ready = asyncio.Event()
+
+    def publish(self, event_type: str, **fields: Any) -> dict[str, Any]:
+        """记录一个事件并唤醒等待中的 next_events"""
+        self.sequence += 1
+        event = {
+            "sequence": self.sequence,
+            "type": event_type,
+            "timestamp": round(time.time(), 3),
+            **fields,
+        }
+        self.latest = event
+        self._pending.append(event)
+        if event_type == "ended":
+            self.ended = True
+            self.last_active = time.monotonic()
+        self._ready.set()
+        return event
+
+    async def next_events(self, timeout: float) -> list[dict[str, Any]]:
+        """返回所有未读事件，没有未读事件时最多等待 timeout 秒"""
+        self.touch()
+        if not self._pending and not self.ended:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        events = list(self._pending)
+        self._pending.clear()
+        self.touch()
+        return events
+
+    def touch(self) -> None:
+        """记录客户端读取了该订阅"""
+        self.last_active = time.monotonic()
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self.last_active
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "subscription_id": self.subscription_id,
+            "uri": self.uri,
+            "controller_id": self.controller_id,
+            "roi": self.roi,
+            "mode": self.mode,
+            "ended": self.ended,
+            "latest": self.latest,
+        }
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from maa.resource import Resource
+
+
+# 作为模板加载的图片格式
+_IMAGE_SUFFIXES = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+@dataclass
+class Template:
+    name: str
+    width: int
+    height: int
+
+
+class TemplateIndex:
+    def __init__(self):
+        """初始化模板索引，按资源 ID 记录资源包 image 目录下可用的模板"""
+        self._templates: dict[str, dict[str, Template]] = {}
+        self._lock = threading.Lock()
+
+    def build(self, resource_id: str, resource: Resource, bundle_path: Path) -> int:
+        """
+        解码资源包 image 目录下的全部模板并预先写入资源，返回模板数量
+
+        模板名为相对 image 目录的路径（如 "buttons/ok.png"），与 pipeline 中的写法一致。
+        预加载后识别时不再从磁盘读取与解码模板图片。
+        """
+        import cv2
+
+        image_dir = bundle_path / "image"
+        templates: dict[str, Template] = {}
+        if image_dir.is_dir():
+            for path in sorted(image_dir.rglob("*")):
+                if path.suffix.lower() not in _IMAGE_SUFFIXES:
+                    continue
+                image = cv2.imread(str(path))
+                if image is None:
+                    continue
+                name = path.relative_to(image_dir).as_posix()
+                resource.override_image(name, image)
+                height, width = image.shape[:2]
+                templates[name] = Template(name, width, height)
+        with self._lock:
+            self._templates[resource_id] = templates
+        return len(templates)
+
+    def get(self, resource_id: str, name: str) -> Optional[Template]:
+        with self._lock:
+            return self._templates.get(resource_id, {}).get(name)
+
+    def list(self, resource_id: str) -> Optional[list[Template]]:
+        with self._lock:
+            templates = self._templates.get(resource_id)
+            return None if templates is None else list(templates.values())
+
+    def forget(self, resource_id: str) -> None:
+        with self._lock:
+            self._templates.pop(resource_id, None)
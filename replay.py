@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from fastmcp import Client
+
+from mcp_server import main as server
+from mcp_server.replay_controller import FrameReplayController
+from mcp_server.session_log import load_frame, read_events, to_jsonable
+
+resource_dir = Path(__file__).parent.resolve() / "assets" / "resource"
+
+# 只依赖单帧画面、可离线重新执行的识别类工具
+REPLAYABLE_TOOLS = ("ocr", "find_text", "find_image")
+
+
+def normalize(value) -> str:
+    return json.dumps(to_jsonable(value), sort_keys=True, ensure_ascii=False)
+
+
+async def replay(args: argparse.Namespace) -> list[dict]:
+    events = list(read_events(args.session))
+    # 录制时的任务管理器 ID -> 控制器 ID，用于找到每次识别所用的截图
+    tasker_controllers = {
+        event["result"]: event["args"].get("controller_id")
+        for event in events
+        if event["type"] == "call" and event["tool"] == "create_tasker"
+    }
+
+    first_frame = next(
+        (
+            load_frame(args.session, event["hash"])
+            for event in events
+            if event["type"] == "frame"
+        ),
+        None,
+    )
+    if first_frame is None:
+        return []
+    # 每次重放前将控制器的画面切换为该次调用录制时的截图
+    controller = FrameReplayController([first_frame], advance_on_input=False)
+    async with Client(server.mcp) as client:
+        resource_id = (
+            await client.call_tool(
+                "load_resource", {"resource_path": str(args.resource)}
+            )
+        ).data
+        controller_id = server.object_registry.register(controller, "controller")
+        controller.post_connection().wait()
+        tasker_id = (
+            await client.call_tool(
+                "create_tasker",
+                {"controller_id": controller_id, "resource_id": resource_id},
+            )
+        ).data
+
+        latest_frames: dict[str, str] = {}
+        outcomes = []
+        for event in events:
+            if event["type"] == "frame":
+                latest_frames[event["key"]] = event["hash"]
+                continue
+            if event["tool"] not in args.tools or event["error"]:
+                continue
+            recorded_tasker = event["args"].get("tasker_id")
+            digest = latest_frames.get(tasker_controllers.get(recorded_tasker))
+            frame = load_frame(args.session, digest) if digest else None
+            if frame is None:
+                outcomes.append({"tool": event["tool"], "status": "skipped"})
+                continue
+
+            controller.frames = [frame]
+            controller.index = 0
+            server.frame_cache.invalidate(controller_id)
+            arguments = {**event["args"], "tasker_id": tasker_id}
+            start = time.perf_counter()
+            result = await client.call_tool(event["tool"], arguments)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            replayed = (result.structured_content or {}).get("result", result.data)
+            matched = normalize(replayed) == normalize(event["result"])
+            outcomes.append(
+                {
+                    "tool": event["tool"],
+                    "args": event["args"],
+                    "frame": digest,
+                    "status": "matched" if matched else "changed",
+                    "recorded": event["result"],
+                    "replayed": to_jsonable(replayed),
+                    "recorded_ms": event["elapsed_ms"],
+                    "replayed_ms": round(elapsed_ms, 2),
+                }
+            )
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="使用录制的会话日志离线重放识别类工具调用，并与录制时的结果比较"
+    )
+    parser.add_argument("session", type=Path, help="会话日志目录")
+    parser.add_argument(
+        "--resource", type=Path, default=resource_dir, help="重放时加载的资源包目录"
+    )
+    parser.add_argument(
+        "--tools",
+        nargs="+",
+        default=list(REPLAYABLE_TOOLS),
+        choices=REPLAYABLE_TOOLS,
+        help="重放的工具",
+    )
+    parser.add_argument("--output", type=Path, help="将逐条比较结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    outcomes = asyncio.run(replay(args))
+    counts = {status: 0 for status in ("matched", "changed", "skipped")}
+    for outcome in outcomes:
+        counts[outcome["status"]] += 1
+    for outcome in outcomes:
+        if outcome["status"] == "changed":
+            print(f"changed: {outcome['tool']} {json.dumps(outcome['args'])}")
+    print(
+        f"replayed {len(outcomes)} calls: {counts['matched']} matched, "
+        f"{counts['changed']} changed, {counts['skipped']} skipped"
+    )
+    if args.output:
+        args.output.write_text(
+            json.dumps(outcomes, indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+    if counts["changed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()